@@ -1,7 +1,9 @@
 import argparse
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from time import sleep
+from typing import Callable
 
 import cv2
 import numpy as np
@@ -11,10 +13,18 @@ from dotenv import load_dotenv
 from .calibrator import calibrate_projector
 from .camera import Camera
 from .camera.calibrate import calibrate_camera
+from .camera.multi import CameraGroup
+from .camera.replay import EndOfReplay, ReplayCamera, SessionRecorder
 from .datastructures import Circle, Form, Playfield, Point2Da, Polygon, Text
-from .hand_tracker import HandTracker
+from .hand_tracker import (BACKENDS, HandDetections, HandMerger, HandTracker, draw_hands,
+                           table_region)
+from .hand_tracker.gestures import GestureEngine
+from .hand_tracker.worker import HandTrackerProcess
+from .latency import FrameTrace, LatencyStats
 from .mqtt_handler import MqttHandler
 from .pcb_tracker import FrameProcessor as PCB_FrameProcessor
+from .pcb_tracker import MarkerDetector, fuse_codes
+from .pcb_tracker.boards import DEFAULT_BOARDS, BoardRegistry
 from .transformer import HomographyTransformer
 
 
@@ -88,7 +98,138 @@ class Schublade:
         return f"Schublade(name={self.name}, id={self.id})"
 
 
-def load_transformer(source_points_file: str, target_points_file: str) -> HomographyTransformer:
+class ZoneEntries:
+    """
+    Hands entering a zone, told apart by their track ids.
+
+    A hand that briefly drops out of the detection while in the zone does
+    not count as entering again.
+    """
+
+    def __init__(self, hold: float = 0.5):
+        """
+        :param hold: Seconds a hand may be missing from the zone and still count as staying.
+        """
+        self.hold = hold
+        self._last_in_zone: dict[int, float] = {}
+
+    def update(self, track_ids, timestamp: float) -> bool:
+        """
+        Feed the track ids of the hands in the zone.
+        :return: Whether a hand entered the zone.
+        """
+        entered = False
+        for id in map(int, track_ids):
+            last = self._last_in_zone.get(id)
+            if last is None or timestamp - last > self.hold:
+                entered = True
+            self._last_in_zone[id] = timestamp
+        self._last_in_zone = {id: last for id, last in self._last_in_zone.items()
+                              if timestamp - last <= self.hold}
+        return entered
+
+
+class CameraPipeline:
+    """
+    Detection state of one camera: its calibration and its hand tracker.
+    """
+
+    def __init__(self, camera: Camera, cam_to_pf: HomographyTransformer, name: str,
+                 marker_detector: MarkerDetector, hand_process: bool = False,
+                 hand_settings: dict | None = None, annotate_hands: bool = True):
+        """
+        :param hand_process: Run hand detection in a worker process instead of inline.
+        :param hand_settings: Keyword arguments for the HandTracker.
+        :param annotate_hands: Draw the hands onto a copy of the frame for the debug view.
+        """
+        self.camera = camera
+        self.cam_to_pf = cam_to_pf
+        self.name = name
+        self.marker_detector = marker_detector
+        self.hand_tracker: HandTracker | None = None
+        self.hand_worker: HandTrackerProcess | None = None
+        if hand_process:
+            self.hand_worker = HandTrackerProcess(**(hand_settings or {}))
+        else:
+            self.hand_tracker = HandTracker(**(hand_settings or {}))
+        self.annotate_hands = annotate_hands
+        self.recorder: SessionRecorder | None = None
+
+    def process(self, frame, trace: FrameTrace | None = None,
+                display_time: float | None = None) -> tuple[PCB_FrameProcessor, cv2.Mat | None, HandDetections]:
+        """
+        Detect markers and hands in a frame of this camera.
+        :param display_time: Time to extrapolate the hands to, on the clock of the frame
+        timestamps, None to not predict them.
+        :return: The frame processor, the annotated hand frame (None if not
+        annotating) and the hands in table coordinates.
+        """
+        if self.hand_worker is not None:
+            # Start the hands first, they run alongside the marker detection
+            self.hand_worker.submit(frame, self.camera.frame_id,
+                                    self.camera.frame_timestamp)
+        cp = PCB_FrameProcessor(frame, trace, self.marker_detector)
+
+        if self.hand_worker is None:
+            hands = self.hand_tracker.detect_hands(
+                frame, trace, self.camera.frame_timestamp, self.annotate_hands)
+            detections = self.hand_tracker.hands
+            detected_at = self.camera.frame_timestamp
+        else:
+            # Newest finished result, possibly from an earlier frame
+            result = self.hand_worker.latest()
+            if trace is not None:
+                trace.mark("hands")
+            detections = HandDetections.empty() if result is None else result.hands
+            detected_at = self.camera.frame_timestamp if result is None else result.timestamp
+            hands = None
+            if self.annotate_hands:
+                hands = draw_hands(frame.copy(), detections.landmarks)
+
+        if display_time is not None and len(detections):
+            # Where the hands will be when the projection shows them
+            lead = min(max(display_time - detected_at, 0.0), MAX_HAND_PREDICTION)
+            detections = detections.predicted(lead)
+        return cp, hands, detections.transformed(self.cam_to_pf)
+
+    def close(self) -> None:
+        if self.hand_worker is not None:
+            self.hand_worker.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+# Longest time hands are extrapolated ahead, in seconds
+MAX_HAND_PREDICTION = 0.25
+
+# Debug windows that can be enabled separately
+VIEWS = ("playfield", "projector", "pcb", "hands", "boards")
+
+
+def camera_cal_file(camera_id: int, multi: bool) -> str:
+    """
+    Calibration file of a camera. A single camera keeps using cal_cam.json.
+    """
+    return f"cal_cam_{camera_id}.json" if multi else "cal_cam.json"
+
+
+def record_file(record: str, camera_id: int, multi: bool) -> str:
+    """
+    Recording file of a camera, with the camera id appended when recording several.
+    """
+    if not multi:
+        return record
+    base, ext = os.path.splitext(record)
+    return f"{base}_{camera_id}{ext}"
+
+
+def load_transformer(source_points_file: str, target_points_file: str,
+                     source_map: Callable[[list[Point2Da]], list[Point2Da]] | None = None) -> HomographyTransformer:
+    """
+    Load a transformer from two calibration files.
+    :param source_map: Optional function applied to the loaded source points,
+    e.g. to move them into the orientation of raw camera frames.
+    """
     with open(source_points_file, "r") as f:
         points_json: dict = json.load(f)
         source_points: list[Point2Da] = [
@@ -127,6 +268,9 @@ def load_transformer(source_points_file: str, target_points_file: str) -> Homogr
             f"Got {len(source_points)}."
         )
 
+    if source_map is not None:
+        source_points = source_map(source_points)
+
     print("Mapping points:")
     for i, (src, tgt) in enumerate(zip(source_points, target_points)):
         print(f"Point {i + 1}: Source {src} -> Target {tgt}")
@@ -134,22 +278,38 @@ def load_transformer(source_points_file: str, target_points_file: str) -> Homogr
     return HomographyTransformer(source_points, target_points)
 
 
-def main(camera_id: int, width: int, height: int, rotate: bool = False) -> None:
+def main(camera_ids: list[int], width: int, height: int, rotate: bool = False, threaded: bool = False,
+         frame_buffers: int = 0, record: str | None = None, replay: list[str] | None = None,
+         realtime: bool = False, capture_settings: dict | None = None,
+         raw_orientation: bool = False, max_skew: float = 0.02,
+         aruco_dict: str = "DICT_4X4_50", aruco_params: dict | None = None,
+         marker_tracking: bool = False, full_scan_interval: int = 30,
+         marker_pyramid: float = 1.0, pose_hold: float = 1.0, pose_threshold: float = 0.5,
+         marker_size: float = 21.2, boards_file: str | None = None,
+         hand_process: bool = False, hand_idle_rate: float = 5.0,
+         hand_full_frame: bool = False, views: list[str] | None = None,
+         predict_hands: bool = False, display_latency: float = 0.05,
+         interaction: str = "hover", hand_backend: str = "mediapipe") -> None:
     """
     Main function to capture and process camera frames.
+    :param views: Debug windows to show, see VIEWS. All if None, none for headless use.
+    :param predict_hands: Extrapolate the hands to the time the projection will show them.
+    :param display_latency: Seconds from the MQTT publish until the projector shows the frame.
+    :param interaction: "hover" to trigger the buttons by reaching into them,
+    "press" to trigger them by pinching inside them.
+    :param hand_backend: Hand detection backend, see hand_tracker.BACKENDS.
     """
+    views = set(VIEWS if views is None else views)
 
     pf = Playfield(1200, 600)
 
-    pcb_pf = Playfield(210, 115)  # A4 size in mm
-    # pcb_tl: Point2Da | None = Point2Da(400, 400)
-    # pcb_tr: Point2Da | None = Point2Da(600, 400)
-    # pcb_bl: Point2Da | None = Point2Da(400, 600)
-    # pcb_br: Point2Da | None = Point2Da(600, 800)
-    pcb_tl: Point2Da | None = None
-    pcb_tr: Point2Da | None = None
-    pcb_bl: Point2Da | None = None
-    pcb_br: Point2Da | None = None
+    # PCB carriers that may be on the table, each with its own pose and playfield
+    board_settings = {"marker_size": marker_size, "hold_time": pose_hold,
+                      "change_threshold": pose_threshold}
+    if boards_file:
+        boards = BoardRegistry.load(boards_file, **board_settings)
+    else:
+        boards = BoardRegistry.from_config(DEFAULT_BOARDS, **board_settings)
 
     s0 = Schublade(0, "http://172.16.1.145/")
     s1 = Schublade(1, "http://172.16.1.145/")
@@ -165,9 +325,6 @@ def main(camera_id: int, width: int, height: int, rotate: bool = False) -> None:
     pf_to_pixel = load_transformer("cal_table.json", "cal_projector.json")
     # pf_to_pixel = load_transformer("cal_projector.json", "cal_table.json")
 
-    print("Loading cam_to_pf points...")
-    cam_to_pf = load_transformer("cal_cam.json", "cal_table.json")
-
     # print(pf_to_pixel.map_point(Point2Da(100, 200)))
 
     # print(cam_to_pf.map_point(Point2Da(640, 402)))
@@ -175,30 +332,115 @@ def main(camera_id: int, width: int, height: int, rotate: bool = False) -> None:
     print("PF to Pixel Transformer:")
     print(pf_to_pixel.map_point(Point2Da(800, 500)))
 
-    last_hand_in_zone_1 = None
-    last_hand_in_zone_2 = None
+    # The same hand seen by several cameras counts once in the zones
+    hand_merger = HandMerger()
+    zone_1_entries = ZoneEntries()
+    zone_2_entries = ZoneEntries()
+
+    if interaction not in ("hover", "press"):
+        raise ValueError(
+            f"Interaction must be hover or press. Got {interaction}.")
+    # Button areas in table coordinates, zone 1 is "Weiter" and zone 2 "Back"
+    gestures = GestureEngine()
+    gestures.add_polygon("next", [(1000, 50), (1050, 50), (1050, 100), (1000, 100)])
+    gestures.add_polygon("back", [(900, 50), (950, 50), (950, 100), (900, 100)])
+
+    multi = len(camera_ids) > 1
+    if replay and len(replay) != len(camera_ids):
+        raise ValueError(
+            f"Need one camera id per replayed recording. "
+            f"Got {len(camera_ids)} ids and {len(replay)} recordings.")
+    if multi and not replay and not threaded:
+        print("Capturing several cameras, enabling threaded capture.")
+        threaded = True
+
+    cameras: CameraGroup | None = None
+    pipelines: list[CameraPipeline] = []
+    executor: ThreadPoolExecutor | None = None
+    latency = LatencyStats()
+    frame_set_id = 0
 
     try:
-        camera = Camera(camera_id, width, height, rotate)
+        if replay:
+            cameras = CameraGroup([
+                ReplayCamera(file, frame_buffers, realtime,
+                             rotate and raw_orientation)
+                for file in replay], max_skew)
+        else:
+            cameras = CameraGroup([
+                Camera(camera_id, width, height, rotate,
+                       threaded, frame_buffers, **(capture_settings or {}),
+                       raw_orientation=raw_orientation)
+                for camera_id in camera_ids], max_skew)
+
+        for camera_id, camera in zip(camera_ids, cameras):
+            # With raw orientation the rotation is folded into this homography
+            print(f"Loading cam_to_pf points for camera {camera_id}...")
+            cam_to_pf = load_transformer(camera_cal_file(camera_id, multi), "cal_table.json",
+                                         camera.sensor_points)
+            hand_settings = {"idle_rate": hand_idle_rate,
+                             "track_id_offset": len(pipelines) * 100000,
+                             "backend": hand_backend}
+            if not hand_full_frame:
+                # Hands outside the table don't matter, detect only there
+                hand_settings["roi"] = table_region(cam_to_pf, pf.width, pf.height,
+                                                    camera.width, camera.height)
+                print(f"Hand detection of camera {camera_id} limited to {hand_settings['roi']}.")
+            pipeline = CameraPipeline(camera, cam_to_pf, str(camera_id),
+                                      MarkerDetector(aruco_dict, aruco_params,
+                                                     marker_tracking, full_scan_interval,
+                                                     pyramid_scale=marker_pyramid),
+                                      hand_process, hand_settings, "hands" in views)
+            if record:
+                pipeline.recorder = SessionRecorder(
+                    record_file(record, camera_id, multi), camera.width, camera.height)
+            pipelines.append(pipeline)
+
+        # Detection of the cameras runs in parallel, OpenCV and MediaPipe release the GIL
+        if multi:
+            executor = ThreadPoolExecutor(max_workers=len(pipelines))
+
         # image = cv2.resize(cv2.imread("testimg.png"), [800, 600])
-        ht = HandTracker()
         while True:
             pf.clear()
 
-            # Clear Framebuffers
-            for _ in range(0):
-                camera.get_frame()
-
-            frame = camera.get_frame()
+            frames = cameras.borrow_frames()
             # frame = image.copy()
+            frame_set_id += 1
+            trace = FrameTrace(
+                frame_set_id, min(cameras.read_times),
+                {pipeline.name: {"frame_id": pipeline.camera.frame_id,
+                                 "captured": pipeline.camera.frame_read_time,
+                                 "timestamp": pipeline.camera.frame_timestamp}
+                 for pipeline in pipelines},
+                min(cameras.timestamps))
+
+            for pipeline, frame in zip(pipelines, frames):
+                if pipeline.recorder is not None:
+                    pipeline.recorder.write(
+                        frame, pipeline.camera.frame_timestamp)
+
+            # Expected display time from the measured capture to publish latency,
+            # on the clock of the frame timestamps, which is the recorded one in replays
+            display_time = None
+            if predict_hands:
+                display_time = trace.timestamp + latency.smoothed + display_latency
+
+            if executor is None:
+                results = [pipelines[0].process(frames[0], trace, display_time)]
+            else:
+                results = list(executor.map(
+                    CameraPipeline.process, pipelines, frames, [trace] * len(pipelines),
+                    [display_time] * len(pipelines)))
 
-            cp = PCB_FrameProcessor(frame)
+            # Marker positions in table space, merged over all cameras
+            table_codes = fuse_codes(
+                [(cp.codes, pipeline.cam_to_pf) for pipeline, (cp, _, _) in zip(pipelines, results)])
+            mapped_hands = hand_merger.merge(
+                [hands for _, _, hands in results], trace.timestamp)
 
-            hand_in_danger = False
             want_to_next_step = False
             want_to_last_step = False
-            hand_in_zone_1 = False
-            hand_in_zone_2 = False
 
             match stepper._current_step:
                 case 1:
@@ -218,46 +460,26 @@ def main(camera_id: int, width: int, height: int, rotate: bool = False) -> None:
                     s1.set_state(False)
                     s2.set_state(False)
 
-            if True:
-                # print(cp.codes)
-                ids = list(cp.codes.keys())
-                ids.sort()
-                if all(x in ids for x in [10, 11, 12, 13]):
-                    # print("Found PCB corners")
-                    pcb_tl = cam_to_pf.map_point(cp.codes[11].center)
-                    pcb_tr = cam_to_pf.map_point(cp.codes[10].center)
-                    pcb_bl = cam_to_pf.map_point(cp.codes[12].center)
-                    pcb_br = cam_to_pf.map_point(cp.codes[13].center)
-                    # print(
-                    #     f"PCB corners: {pcb_tl}, {pcb_tr}, {pcb_bl}, {pcb_br}")
-                    # print(
-                    #     f"PCB Type: {type(pcb_tl)} {type(pcb_tr)} {type(pcb_bl)} {type(pcb_br)}")
-
-                if all(x in ids for x in [20, 21, 22, 23]):
-                    pcb_tl = cam_to_pf.map_point(cp.codes[20])
-                    pcb_tr = cam_to_pf.map_point(cp.codes[21])
-                    pcb_bl = cam_to_pf.map_point(cp.codes[22])
-                    pcb_br = cam_to_pf.map_point(cp.codes[23])
-
-            hands = ht.detect_hands(frame)
-            handpos = ht.get_hand_positions()
-            mapped_hands = cam_to_pf.map_object(handpos)
-            for nrh, hand in enumerate(mapped_hands):
-                if len(hand) < 4:
-                    continue
-                point: Point2Da
-                for i, point in enumerate(hand):
-
-                    if point.y < 200 and point.x < 800 and point.x > 400:
-                        hand_in_danger = True
-
-                    if point.y > 50 and point.y < 100 \
-                            and point.x > 1000 and point.x < 1050:
-                        hand_in_zone_1 = True
-
-                    if point.y > 50 and point.y < 100 \
-                            and point.x > 900 and point.x < 950:
-                        hand_in_zone_2 = True
+            # Register the PCBs from all corners of their visible markers
+            active_boards = boards.update(table_codes, trace.timestamp)
+
+            # All landmarks of all hands at once, in table coordinates
+            x = mapped_hands.landmarks[..., 0]
+            y = mapped_hands.landmarks[..., 1]
+            hand_in_danger = bool(np.any((y < 200) & (x < 800) & (x > 400)))
+            clicks = gestures.update(mapped_hands, trace.timestamp)
+            if interaction == "press":
+                hand_in_zone_1 = gestures.is_pressed("next")
+                hand_in_zone_2 = gestures.is_pressed("back")
+            else:
+                # Per hand, so a second hand reaching in is told apart
+                in_button_row = (y > 50) & (y < 100)
+                in_zone_1 = np.any(
+                    in_button_row & (x > 1000) & (x < 1050), axis=1)
+                in_zone_2 = np.any(
+                    in_button_row & (x > 900) & (x < 950), axis=1)
+                hand_in_zone_1 = bool(in_zone_1.any())
+                hand_in_zone_2 = bool(in_zone_2.any())
 
             pf.put_form(
                 11, Polygon(
@@ -301,30 +523,39 @@ def main(camera_id: int, width: int, height: int, rotate: bool = False) -> None:
                 )
             )
 
-            # If all PCB corners are detected, draw the PCB
-            if type(pcb_tl) is Point2Da and type(pcb_tr) is Point2Da and \
-                    type(pcb_bl) is Point2Da and type(pcb_br) is Point2Da:
-                tr = HomographyTransformer(
-                    [Point2Da(0, 0),
-                     Point2Da(pcb_pf.width, 0),
-                     Point2Da(0, pcb_pf.height),
-                     Point2Da(pcb_pf.width, pcb_pf.height)],
-                    [pcb_tl, pcb_tr, pcb_bl, pcb_br],
-                )
+            # Map the forms of every PCB with a known pose straight to
+            # projector pixels, only when its pose or the step changed
+            for board in active_boards:
+                pcb_pf = board.playfield
+                if board.pose.changed or board.overlay_key != stepper._current_step:
+                    board.to_table = HomographyTransformer(
+                        [Point2Da(0, 0),
+                         Point2Da(pcb_pf.width, 0),
+                         Point2Da(0, pcb_pf.height),
+                         Point2Da(pcb_pf.width, pcb_pf.height)],
+                        board.pose.pose,
+                    )
 
-                pcb_pf.clear()
-                pcb_pf.put_form(
-                    5005, stepper.get_current_step())
-                # print(pcb_pf._forms)
-                pcb_pf.transform(tr, pf)
+                    pcb_pf.clear()
+                    pcb_pf.put_form(
+                        5005, stepper.get_current_step())
+                    # print(pcb_pf._forms)
+                    board.overlay.clear()
+                    pcb_pf.transform(pf_to_pixel @ board.to_table, board.overlay,
+                                     id_offset=board.form_id_offset)
+                    board.overlay_key = stepper._current_step
 
             # cv2.imshow('Codes', frame)
 
-            if hand_in_zone_1 != last_hand_in_zone_1 and hand_in_zone_1:
-                want_to_next_step = True
-
-            if hand_in_zone_2 != last_hand_in_zone_2 and hand_in_zone_2:
-                want_to_last_step = True
+            if interaction == "press":
+                # A deliberate pinch held inside the button
+                want_to_next_step = "next" in clicks
+                want_to_last_step = "back" in clicks
+            else:
+                want_to_next_step = zone_1_entries.update(
+                    mapped_hands.track_ids[in_zone_1], trace.timestamp)
+                want_to_last_step = zone_2_entries.update(
+                    mapped_hands.track_ids[in_zone_2], trace.timestamp)
 
             if hand_in_danger and (hand_in_zone_1 or hand_in_zone_2):
                 pf.put_form(
@@ -356,35 +587,77 @@ def main(camera_id: int, width: int, height: int, rotate: bool = False) -> None:
                 stepper.back_step()
                 want_to_last_step = False
 
-            last_hand_in_zone_1 = hand_in_zone_1
-            last_hand_in_zone_2 = hand_in_zone_2
 
             projector_pf.clear()
             pf.transform(pf_to_pixel,
-                         projector_pf)
-
-            cv2.imshow('Playfield', pf.render())
-            cv2.imshow('Projector', projector_pf.render(
-                offset=Point2Da(0, 0)))
-            cv2.imshow('PCB', cp.get_marked_frame())
-            cv2.imshow('Hands', hands)
-            cv2.imshow('PCB_PF', pcb_pf.render())
-
-            # Sende pf per MQTT
-            mqtt.send(projector_pf.to_json())
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+                         projector_pf, trace)
+            for board in active_boards:
+                for id, form in board.overlay.get_forms().items():
+                    projector_pf.put_form(id, form)
+
+            # Sende pf per MQTT, before the debug views so they don't add latency
+            mqtt.send_playfield(projector_pf, trace)
+            latency.add(trace)
+
+            # Debug views, each one renders or copies a full image
+            if "playfield" in views:
+                # The PCB overlays skip the table, add them only for the view
+                for board in active_boards:
+                    board.playfield.transform(board.to_table, pf,
+                                              id_offset=board.form_id_offset)
+                cv2.imshow('Playfield', pf.render())
+            if "projector" in views:
+                cv2.imshow('Projector', projector_pf.render(
+                    offset=Point2Da(0, 0)))
+            for pipeline, (cp, hands, _) in zip(pipelines, results):
+                suffix = f" {pipeline.name}" if multi else ""
+                if "pcb" in views:
+                    cv2.imshow('PCB' + suffix,
+                               pipeline.camera.display_frame(cp.get_marked_frame()))
+                if "hands" in views:
+                    cv2.imshow('Hands' + suffix,
+                               pipeline.camera.display_frame(hands))
+            if "boards" in views:
+                for board in active_boards:
+                    cv2.imshow(f'PCB_PF {board.id}', board.playfield.render())
+
+            cameras.release_frames(frames)
+
+            if views and cv2.waitKey(1) & 0xFF == ord('q'):
                 break
 
     # except ValueError as e:
     #     print(f"Error: {e}")
+    except EndOfReplay as e:
+        print(e)
     except KeyboardInterrupt:
         print("Exiting...")
         projector_pf.clear()
         mqtt.send(projector_pf.to_json())
     finally:
-        camera.cap.release()
-        cv2.destroyAllWindows()
+        if latency.count:
+            print(f"Capture to publish {latency}")
+        if executor is not None:
+            executor.shutdown()
+        for pipeline in pipelines:
+            tracker = pipeline.hand_tracker
+            if tracker is not None and tracker.idle_skips:
+                print(f"Hand detection of camera {pipeline.name} skipped {tracker.idle_skips} "
+                      f"of {tracker.inferences + tracker.idle_skips} frames without hands.")
+            pipeline.close()
+        if cameras is not None:
+            for camera in cameras:
+                print(
+                    f"Camera {camera.camera_id} delivered {camera.measured_fps:.1f} fps.")
+                if camera.threaded and camera.dropped_frames:
+                    print(
+                        f"Camera {camera.camera_id} dropped {camera.dropped_frames} stale frames.")
+            if cameras.misaligned_sets:
+                print(
+                    f"{cameras.misaligned_sets} frame sets exceeded the allowed camera skew.")
+            cameras.release()
+        if views:
+            cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
@@ -392,7 +665,8 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Camera Capture")
     parser.add_argument(
-        "--camera_id", type=int, default=0, help="Camera ID (default: 0)")
+        "--camera_id", type=int, nargs="+", default=[0],
+        help="Camera ID, several for multi-camera capture with one cal_cam_<id>.json each (default: 0)")
     parser.add_argument(
         "--width", type=int, default=800, help="Width of the frame (default: 800)")
     parser.add_argument(
@@ -401,8 +675,88 @@ if __name__ == "__main__":
         "--projector", action="store_true", help="Calibrate Projector")
     parser.add_argument(
         "--camera", action="store_true", help="Calibrate Camera")
+    parser.add_argument(
+        "--aruco_dict", type=str, default="DICT_4X4_50",
+        help="ArUco dictionary of the PCB markers (default: DICT_4X4_50)")
+    parser.add_argument(
+        "--aruco_params", type=str, default=None,
+        help="JSON file with ArUco DetectorParameters overrides")
+    parser.add_argument(
+        "--marker_tracking", action="store_true",
+        help="Search for markers only around their last known position")
+    parser.add_argument(
+        "--full_scan_interval", type=int, default=30,
+        help="Frames between full-frame marker scans with --marker_tracking (default: 30)")
+    parser.add_argument(
+        "--pose_hold", type=float, default=1.0,
+        help="Seconds to keep the PCB pose while its markers are hidden (default: 1.0)")
+    parser.add_argument(
+        "--pose_threshold", type=float, default=0.5,
+        help="PCB corner movement in table units that updates the overlay (default: 0.5)")
+    parser.add_argument(
+        "--marker_size", type=float, default=21.2,
+        help="Edge length of the PCB markers in table units (default: 21.2)")
+    parser.add_argument(
+        "--boards", type=str, default=None,
+        help="JSON file with the board registry (default: the two built-in carriers)")
+    parser.add_argument(
+        "--marker_pyramid", type=float, default=1.0,
+        help="Detect markers on a frame downscaled by this factor and refine the corners "
+             "at full resolution, e.g. 0.5 for 1920x1080 cameras (default: 1, off)")
+    parser.add_argument(
+        "--hand_process", action="store_true",
+        help="Run hand detection in a separate process on its own core, using the newest finished result")
+    parser.add_argument(
+        "--hand_backend", type=str, choices=list(BACKENDS), default="mediapipe",
+        help="Hand detection backend, contour needs far less CPU but only approximates the fingers (default: mediapipe)")
+    parser.add_argument(
+        "--hand_idle_rate", type=float, default=5.0,
+        help="Hand detections per second while no hand is in view, 0 to detect on every frame (default: 5)")
+    parser.add_argument(
+        "--hand_full_frame", action="store_true",
+        help="Detect hands in the whole camera image instead of only around the table")
+    parser.add_argument(
+        "--predict_hands", action="store_true",
+        help="Extrapolate hand positions to the expected display time using the measured latency")
+    parser.add_argument(
+        "--display_latency", type=float, default=0.05,
+        help="Seconds from publishing a frame until the projector shows it, for --predict_hands (default: 0.05)")
+    parser.add_argument(
+        "--interaction", type=str, choices=["hover", "press"], default="hover",
+        help="Trigger the buttons by reaching into them or by pinching inside them (default: hover)")
+    parser.add_argument(
+        "--headless", action="store_true",
+        help="Show no debug windows, for production units without a screen")
+    parser.add_argument(
+        "--views", type=str, nargs="+", choices=VIEWS, default=list(VIEWS),
+        help="Debug windows to show (default: all)")
+    parser.add_argument(
+        "--max_skew", type=float, default=0.02,
+        help="Maximum capture time difference between cameras in seconds (default: 0.02)")
     parser.add_argument(
         "--rotate", action="store_true", help="Rotate camera frame")
+    parser.add_argument(
+        "--raw_orientation", action="store_true",
+        help="With --rotate, keep frames unrotated and apply the rotation in the calibration homography")
+    parser.add_argument(
+        "--fourcc", type=str, default=None, help="Capture pixel format, e.g. MJPG")
+    parser.add_argument(
+        "--fps", type=float, default=None, help="Requested capture frame rate")
+    parser.add_argument(
+        "--buffer_size", type=int, default=None, help="Number of frames the driver may buffer")
+    parser.add_argument(
+        "--exposure", type=float, default=None, help="Lock the exposure to this driver value")
+    parser.add_argument(
+        "--threaded", action="store_true", help="Grab frames in a background thread and always process the newest one")
+    parser.add_argument(
+        "--frame_buffers", type=int, default=4, help="Number of preallocated frame buffers, 0 to disable (default: 4)")
+    parser.add_argument(
+        "--record", type=str, default=None, help="Record the session to this video file")
+    parser.add_argument(
+        "--replay", type=str, nargs="+", default=None,
+        help="Replay recorded sessions instead of using the cameras, one per camera ID")
+    parser.add_argument(
+        "--realtime", action="store_true", help="Replay with the recorded timing instead of as fast as possible")
     args = parser.parse_args()
 
     mqtt = MqttHandler(os.getenv("MQTT_BROKER"),
@@ -415,9 +769,32 @@ if __name__ == "__main__":
         calibrate_projector(mqtt)
         exit(1)
 
+    aruco_params = None
+    if args.aruco_params:
+        with open(args.aruco_params, "r") as f:
+            aruco_params = json.load(f)
+
+    capture_settings = {
+        "fourcc": args.fourcc,
+        "fps": args.fps,
+        "buffer_size": args.buffer_size,
+        "exposure": args.exposure,
+    }
+
     if args.camera:
-        calibrate_camera(Camera(args.camera_id, args.width,
-                         args.height, args.rotate), "cal_cam.json")
+        for camera_id in args.camera_id:
+            calibrate_camera(Camera(camera_id, args.width,
+                             args.height, args.rotate, **capture_settings,
+                             raw_orientation=args.raw_orientation),
+                             camera_cal_file(camera_id, len(args.camera_id) > 1))
         exit(1)
 
-    main(args.camera_id, args.width, args.height, args.rotate)
+    main(args.camera_id, args.width, args.height, args.rotate, args.threaded,
+         args.frame_buffers, args.record, args.replay, args.realtime,
+         capture_settings, args.raw_orientation, args.max_skew,
+         args.aruco_dict, aruco_params, args.marker_tracking,
+         args.full_scan_interval, args.marker_pyramid, args.pose_hold,
+         args.pose_threshold, args.marker_size, args.boards,
+         args.hand_process, args.hand_idle_rate, args.hand_full_frame,
+         [] if args.headless else args.views, args.predict_hands,
+         args.display_latency, args.interaction, args.hand_backend)
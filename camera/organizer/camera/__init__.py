@@ -1,30 +1,301 @@
+import threading
+import time
+
 import cv2
+import numpy as np
+
+from ..datastructures import Point2Da
+from .ring import FrameRing
+
+
+class FpsCounter:
+    """
+    Measures the rate of recurring events, smoothed over roughly `smoothing` events.
+    """
+
+    def __init__(self, smoothing: int = 30):
+        self._alpha = 1.0 / smoothing
+        self._last: float | None = None
+        self._interval: float | None = None
+
+    def tick(self, timestamp: float | None = None) -> None:
+        if timestamp is None:
+            timestamp = time.time()
+        if self._last is not None:
+            interval = timestamp - self._last
+            if self._interval is None:
+                self._interval = interval
+            else:
+                self._interval += self._alpha * (interval - self._interval)
+        self._last = timestamp
+
+    @property
+    def fps(self) -> float:
+        if not self._interval:
+            return 0.0
+        return 1.0 / self._interval
 
 
 class Camera:
-    def __init__(self, camera_id=0, width: int | None = None, height: int | None = None, rotate: bool = False):
+    def __init__(self, camera_id=0, width: int | None = None, height: int | None = None, rotate: bool = False,
+                 threaded: bool = False, frame_buffers: int = 0, fourcc: str | None = None,
+                 fps: float | None = None, buffer_size: int | None = None, exposure: float | None = None,
+                 raw_orientation: bool = False):
         self.camera_id = camera_id
         self.width = width
         self.height = height
         self.rotate = rotate
+        # Keep frames in sensor orientation and apply the rotation to coordinates only
+        self.raw_orientation = raw_orientation
+        self._rotate_pixels = rotate and not raw_orientation
+        self.threaded = threaded
         self.cap = cv2.VideoCapture(camera_id)
+        # The pixel format has to be chosen before the resolution,
+        # many UVC drivers only offer high frame rates with MJPG.
+        if fourcc is not None:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
         if width is not None and height is not None:
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH,  width)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps is not None:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size is not None:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        if exposure is not None:
+            # 1 selects manual exposure on V4L2, which locks it to the given value
+            self.cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, 1)
+            self.cap.set(cv2.CAP_PROP_EXPOSURE, exposure)
         if not self.cap.isOpened():
             raise ValueError(f"Cannot open camera {camera_id}")
+
+        # Read back what the driver actually agreed to
         self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        code = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        self.fourcc = "".join(chr((code >> 8 * i) & 0xFF) for i in range(4))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.buffer_size = int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE))
+        self.exposure = self.cap.get(cv2.CAP_PROP_EXPOSURE)
         print(
-            f"Camera {camera_id} opened with resolution {self.width}x{self.height}")
+            f"Camera {camera_id} opened with resolution {self.width}x{self.height}, "
+            f"format {self.fourcc!r} at {self.fps:.1f} fps, buffer size {self.buffer_size}, "
+            f"exposure {self.exposure}")
+        if fourcc is not None and self.fourcc != fourcc:
+            print(f"Warning: camera {camera_id} ignored format {fourcc!r}")
+        if fps is not None and abs(self.fps - fps) > 0.5:
+            print(f"Warning: camera {camera_id} ignored {fps} fps")
+
+        # Rate at which frames actually arrive from the driver
+        self._fps_counter = FpsCounter()
+
+        # Metadata of the frame last returned by get_frame()
+        self.frame_id = 0
+        self.frame_timestamp: float | None = None
+        # Wall-clock time that frame was read, equal to the timestamp for live cameras
+        self.frame_read_time: float | None = None
+        # Frames that were captured but replaced before anyone consumed them
+        self.dropped_frames = 0
 
-    def get_frame(self):
-        ret, frame = self.cap.read()
+        # Preallocated buffers that frames are read and rotated into
+        self.ring: FrameRing | None = None
+        self._scratch: np.ndarray | None = None
+        if frame_buffers:
+            shape = (self.height, self.width, 3)
+            self.ring = FrameRing(shape, frame_buffers)
+            if self._rotate_pixels:
+                self._scratch = np.empty(shape, dtype=np.uint8)
+
+        self._cond = threading.Condition()
+        self._latest = None
+        self._latest_id = 0
+        self._latest_timestamp: float | None = None
+        self._latest_read_time: float | None = None
+        self._error: Exception | None = None
+        self._running = False
+        self._thread: threading.Thread | None = None
+        if threaded:
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._grab_loop, name=f"camera-{camera_id}", daemon=True)
+            self._thread.start()
+
+    def _read(self, out: np.ndarray | None = None):
+        """
+        Read a frame from the driver, into `out` if given.
+        """
+        if self._rotate_pixels:
+            ret, frame = self.cap.read(self._scratch)
+        else:
+            ret, frame = self.cap.read(out)
+        timestamp = time.time()
         if not ret:
             raise ValueError("Can't receive frame")
-        if self.rotate:
-            frame = cv2.rotate(frame, cv2.ROTATE_180)
+        self._fps_counter.tick(timestamp)
+        if self._rotate_pixels:
+            frame = cv2.rotate(frame, cv2.ROTATE_180, dst=out)
+        if out is not None and frame is not out:
+            if frame.shape != out.shape:
+                raise ValueError(
+                    f"Frame shape {frame.shape} does not match buffer shape {out.shape}")
+            np.copyto(out, frame)
+            frame = out
+        return frame, timestamp
+
+    def _read_time(self, timestamp: float) -> float:
+        """
+        Wall-clock time the frame with this capture timestamp was read.
+        """
+        return timestamp
+
+    def _read_slot(self):
+        """
+        Read a frame into a free ring slot.
+        :return: (slot, frame, timestamp), slot and frame are None if all buffers
+        were busy and the frame was only grabbed to drain the driver.
+        """
+        slot = self.ring.acquire()
+        if slot is None:
+            if not self.cap.grab():
+                raise ValueError("Can't receive frame")
+            timestamp = time.time()
+            self._fps_counter.tick(timestamp)
+            return None, None, timestamp
+        try:
+            frame, timestamp = self._read(self.ring.buffers[slot])
+        except ValueError:
+            self.ring.cancel(slot)
+            raise
+        return slot, frame, timestamp
+
+    def _grab_loop(self):
+        """
+        Keep reading from the driver so the buffer never holds stale frames.
+        Only the newest frame is kept, older unconsumed ones count as dropped.
+        """
+        while self._running:
+            try:
+                if self.ring is None:
+                    slot = None
+                    frame, timestamp = self._read()
+                else:
+                    slot, frame, timestamp = self._read_slot()
+            except ValueError as e:
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                if self.ring is not None and slot is None:
+                    # Every buffer is borrowed, nowhere to keep this frame
+                    self.dropped_frames += 1
+                    continue
+                if self._latest is not None and self._latest_id > self.frame_id:
+                    self.dropped_frames += 1
+                if slot is not None:
+                    self.ring.publish(slot)
+                self._latest = frame
+                self._latest_id += 1
+                self._latest_timestamp = timestamp
+                self._latest_read_time = self._read_time(timestamp)
+                self._cond.notify_all()
+
+    def _next_frame(self, timeout: float, borrow: bool):
+        if not self.threaded:
+            if self.ring is None:
+                frame, timestamp = self._read()
+            else:
+                slot, frame, timestamp = self._read_slot()
+                if slot is None:
+                    raise ValueError("All frame buffers are borrowed")
+                self.ring.publish(slot)
+                if borrow:
+                    frame = self.ring.borrow_latest()
+            self.frame_id += 1
+            self.frame_timestamp = timestamp
+            self.frame_read_time = self._read_time(timestamp)
+            return frame
+
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._latest_id > self.frame_id or self._error is not None,
+                timeout)
+            if self._latest_id <= self.frame_id:
+                if self._error is not None:
+                    raise self._error
+                raise ValueError("Can't receive frame")
+            self.frame_id = self._latest_id
+            self.frame_timestamp = self._latest_timestamp
+            self.frame_read_time = self._latest_read_time
+            if borrow and self.ring is not None:
+                return self.ring.borrow_latest()
+            return self._latest
+
+    @property
+    def rotated_in_coordinates(self) -> bool:
+        """
+        True if frames are delivered unrotated and the rotation must be applied to coordinates.
+        """
+        return self.rotate and self.raw_orientation
+
+    def sensor_points(self, points: list) -> list:
+        """
+        Map points given in upright frame coordinates, as stored in the
+        calibration files, to the coordinates of the frames this camera delivers.
+        """
+        if not self.rotated_in_coordinates:
+            return points
+        # Same mapping as cv2.ROTATE_180 applies to pixel indices
+        return [Point2Da(self.width - 1 - p[0], self.height - 1 - p[1]) for p in points]
+
+    def display_frame(self, frame):
+        """
+        Return the frame in upright orientation for showing it to a human.
+        """
+        if self.rotated_in_coordinates:
+            return cv2.rotate(frame, cv2.ROTATE_180)
         return frame
 
+    @property
+    def measured_fps(self) -> float:
+        """
+        Frame rate actually achieved by the driver, independent of how fast frames are consumed.
+        """
+        return self._fps_counter.fps
+
+    def get_frame(self, timeout: float = 1.0):
+        """
+        Return the next frame.
+        In threaded mode this is the newest frame the grabber thread has seen,
+        waiting up to `timeout` seconds if it was already returned once.
+        With frame buffers the result is a copy the caller owns, use
+        borrow_frame() to avoid the copy.
+        """
+        frame = self._next_frame(timeout, borrow=self.ring is not None)
+        if self.ring is None:
+            return frame
+        copy = frame.copy()
+        self.ring.release(frame)
+        return copy
+
+    def borrow_frame(self, timeout: float = 1.0):
+        """
+        Return the next frame without copying it.
+        The frame is only valid until it is handed back with release_frame()
+        and must not be written to.
+        """
+        return self._next_frame(timeout, borrow=True)
+
+    def release_frame(self, frame) -> None:
+        """
+        Hand back a frame returned by borrow_frame().
+        """
+        if self.ring is not None:
+            self.ring.release(frame)
+
     def release(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
         self.cap.release()
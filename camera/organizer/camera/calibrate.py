@@ -46,7 +46,8 @@ def calibrate_camera(camera: Camera, cal_file: str = "cal_cam.json"):
     listener = KeyboardListener()
 
     while True:
-        frame = camera.get_frame()
+        # Points are edited and stored in upright coordinates
+        frame = camera.display_frame(camera.get_frame())
         # rawkey = readchar.readkey()
         if listener.key_available():
             rawkey = listener.get_key()
@@ -108,5 +109,5 @@ def calibrate_camera(camera: Camera, cal_file: str = "cal_cam.json"):
 
     print("\n")
     listener.stop()
-    camera.cap.release()
+    camera.release()
     cv2.destroyAllWindows()
@@ -0,0 +1,62 @@
+from . import Camera
+
+
+class CameraGroup:
+    """
+    Captures time-aligned sets of frames from several cameras.
+
+    The cameras should run threaded so they capture concurrently; a set is
+    built from the newest frame of every camera, and cameras whose frame is
+    more than `max_skew` seconds older than the newest one are read again.
+    """
+
+    def __init__(self, cameras: list[Camera], max_skew: float = 0.02, max_retries: int = 2):
+        if not cameras:
+            raise ValueError("Need at least one camera.")
+        self.cameras = cameras
+        self.max_skew = max_skew
+        self.max_retries = max_retries
+        # Sets whose skew could not be brought below max_skew
+        self.misaligned_sets = 0
+
+    def __len__(self):
+        return len(self.cameras)
+
+    def __iter__(self):
+        return iter(self.cameras)
+
+    @property
+    def timestamps(self) -> list[float | None]:
+        return [camera.frame_timestamp for camera in self.cameras]
+
+    @property
+    def read_times(self) -> list[float | None]:
+        return [camera.frame_read_time for camera in self.cameras]
+
+    def borrow_frames(self, timeout: float = 1.0) -> list:
+        """
+        Borrow one frame from every camera, aligned in time.
+        Hand them back with release_frames().
+        """
+        frames = [camera.borrow_frame(timeout) for camera in self.cameras]
+        for _ in range(self.max_retries):
+            newest = max(self.timestamps)
+            stale = [i for i, camera in enumerate(self.cameras)
+                     if newest - camera.frame_timestamp > self.max_skew]
+            if not stale:
+                return frames
+            for i in stale:
+                self.cameras[i].release_frame(frames[i])
+                frames[i] = self.cameras[i].borrow_frame(timeout)
+
+        if max(self.timestamps) - min(self.timestamps) > self.max_skew:
+            self.misaligned_sets += 1
+        return frames
+
+    def release_frames(self, frames: list) -> None:
+        for camera, frame in zip(self.cameras, frames):
+            camera.release_frame(frame)
+
+    def release(self) -> None:
+        for camera in self.cameras:
+            camera.release()
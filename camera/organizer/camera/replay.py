@@ -0,0 +1,125 @@
+import json
+import os
+import time
+
+import cv2
+
+from . import Camera
+
+
+class EndOfReplay(ValueError):
+    """Raised when a replayed session has no frames left."""
+
+
+def timestamps_file(video_file: str) -> str:
+    """
+    Path of the sidecar file holding the per-frame capture timestamps of a recording.
+    """
+    return video_file + ".timestamps.jsonl"
+
+
+def load_timestamps(video_file: str) -> list[float] | None:
+    """
+    Load the capture timestamps of a recording, or None if it has no sidecar file.
+    """
+    path = timestamps_file(video_file)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return [float(json.loads(line)["timestamp"]) for line in f if line.strip()]
+
+
+class SessionRecorder:
+    """
+    Records the frames seen by the organizer loop to a video file,
+    together with their capture timestamps, so the session can be replayed
+    with ReplayCamera.
+    """
+
+    def __init__(self, video_file: str, width: int, height: int, fps: float = 30.0, fourcc: str = "MJPG"):
+        self.video_file = video_file
+        self.writer = cv2.VideoWriter(
+            video_file, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+        if not self.writer.isOpened():
+            raise ValueError(f"Cannot open video file {video_file} for recording")
+        # One JSON object per line, so a crash only loses the last frame
+        self._timestamps = open(timestamps_file(video_file), "w")
+        self.frames = 0
+        print(f"Recording session to {video_file}")
+
+    def write(self, frame, timestamp: float) -> None:
+        self.writer.write(frame)
+        self._timestamps.write(json.dumps(
+            {"frame": self.frames, "timestamp": timestamp}) + "\n")
+        self.frames += 1
+
+    def close(self) -> None:
+        self.writer.release()
+        self._timestamps.close()
+        print(f"Recorded {self.frames} frames to {self.video_file}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ReplayCamera(Camera):
+    """
+    A Camera that replays a recorded session instead of reading a live device.
+
+    Every recorded frame is returned exactly once, in order, with its recorded
+    capture timestamp, so runs over the same recording are reproducible.
+    By default frames are delivered as fast as they are consumed; with
+    `realtime` the original capture timing is reproduced.
+    Set `rotate` for sessions recorded in raw orientation from a rotated camera.
+    """
+
+    def __init__(self, video_file: str, frame_buffers: int = 0, realtime: bool = False, rotate: bool = False):
+        if not os.path.exists(video_file):
+            raise ValueError(f"Recording {video_file} does not exist")
+        self.video_file = video_file
+        self.realtime = realtime
+        self.timestamps = load_timestamps(video_file)
+        self._index = 0
+        self._replay_start: float | None = None
+
+        # Recordings already hold the frames as the pipeline saw them,
+        # so their pixels are never rotated again and never read ahead in a thread.
+        super().__init__(video_file, rotate=rotate, threaded=False,
+                         frame_buffers=frame_buffers, raw_orientation=True)
+
+        if not self.fps:
+            self.fps = 30.0
+        if self.timestamps is None:
+            print(
+                f"No timestamps for {video_file}, assuming {self.fps:.1f} fps")
+
+    def _read(self, out=None):
+        try:
+            frame, _ = super()._read(out)
+        except ValueError:
+            raise EndOfReplay(f"Replay of {self.video_file} finished")
+
+        if self.timestamps is not None and self._index < len(self.timestamps):
+            timestamp = self.timestamps[self._index]
+            start = self.timestamps[0]
+        else:
+            timestamp = self._index / self.fps
+            start = 0.0
+        self._index += 1
+
+        if self.realtime:
+            now = time.time()
+            if self._replay_start is None:
+                self._replay_start = now
+            delay = (timestamp - start) - (now - self._replay_start)
+            if delay > 0:
+                time.sleep(delay)
+
+        return frame, timestamp
+
+    def _read_time(self, timestamp: float) -> float:
+        # The recorded timestamps are from the time of recording
+        return time.time()
@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+
+
+class FrameRing:
+    """
+    A fixed set of preallocated frame buffers.
+
+    The writer acquires a free slot, fills it in place and publishes it as the
+    latest frame. Readers borrow the latest frame and must release it again;
+    a borrowed or latest slot is never handed out for writing, so readers can
+    use the buffer without copying it.
+    """
+
+    def __init__(self, shape, size: int = 4, dtype=np.uint8):
+        if size < 3:
+            raise ValueError(
+                f"Need at least 3 frame buffers (writer, latest, reader). Got {size}.")
+        self.buffers = [np.empty(shape, dtype=dtype) for _ in range(size)]
+        self.latest: int | None = None
+        self._refs = [0] * size
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> int | None:
+        """
+        Reserve a slot for writing.
+        :return: The slot index or None if every buffer is in use.
+        """
+        with self._lock:
+            for i in range(len(self.buffers)):
+                slot = (self._next + i) % len(self.buffers)
+                if self._refs[slot] == 0 and slot != self.latest:
+                    self._refs[slot] = 1
+                    self._next = slot + 1
+                    return slot
+        return None
+
+    def cancel(self, slot: int) -> None:
+        """
+        Give back a slot acquired for writing without publishing it.
+        """
+        with self._lock:
+            self._refs[slot] -= 1
+
+    def publish(self, slot: int) -> None:
+        """
+        Make a written slot the latest frame.
+        """
+        with self._lock:
+            self._refs[slot] -= 1
+            self.latest = slot
+
+    def borrow_latest(self) -> np.ndarray:
+        """
+        Borrow the latest frame. It stays valid until passed to release().
+        """
+        with self._lock:
+            if self.latest is None:
+                raise ValueError("No frame has been published yet.")
+            self._refs[self.latest] += 1
+            return self.buffers[self.latest]
+
+    def release(self, frame: np.ndarray) -> None:
+        """
+        Return a borrowed frame to the ring.
+        """
+        with self._lock:
+            for slot, buffer in enumerate(self.buffers):
+                if buffer is frame:
+                    if self._refs[slot] <= 0:
+                        raise ValueError("Frame was not borrowed.")
+                    self._refs[slot] -= 1
+                    return
+        raise ValueError("Frame does not belong to this ring.")
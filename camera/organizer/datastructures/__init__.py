@@ -8,6 +8,7 @@ import cv2
 import numpy as np
 
 from ..geometry import Point2Da
+from ..latency import FrameTrace
 from ..transformer import HomographyTransformer
 
 
@@ -176,15 +177,21 @@ class Playfield:
     def __repr__(self):
         return f"playfield({self.width}, {self.height})"
 
-    def to_json(self) -> str:
-        """Convert the Playfield to a JSON string."""
+    def to_json(self, meta: dict | None = None) -> str:
+        """
+        Convert the Playfield to a JSON string.
+        :param meta: Optional extra data sent along, e.g. a FrameTrace.
+        """
         forms_json = {id: form.to_json() if form is not None else None
                       for id, form in self._forms.items()}
-        return json.dumps({
+        data = {
             "width": self.width,
             "height": self.height,
             "forms": forms_json
-        })
+        }
+        if meta is not None:
+            data["meta"] = meta
+        return json.dumps(data)
 
     @staticmethod
     def from_json(json_str: str) -> 'Playfield':
@@ -255,36 +262,54 @@ class Playfield:
 
         return image
 
-    def transform(self, transformer: HomographyTransformer, dest_pf: Playfield) -> Playfield:
+    def transform(self, transformer: HomographyTransformer, dest_pf: Playfield,
+                  trace: FrameTrace | None = None, id_offset: int = 0) -> Playfield:
         """
         Apply a transformation to all forms in the playfield.
+        :param id_offset: Added to the form ids in dest_pf, to keep several sources apart.
         """
 
-        for id, form in self._forms.items():
-            if form is None:
-                continue
-            elif isinstance(form, Circle):
-                center = transformer.map_point(form.center)
+        forms = [(id, form)
+                 for id, form in self._forms.items() if form is not None]
+        points = []
+        for id, form in forms:
+            if isinstance(form, Circle):
+                points.append([form.center])
+            elif isinstance(form, Polygon):
+                points.append(form.points)
+            elif isinstance(form, Text):
+                points.append([form.position])
+            else:
+                raise ValueError(f"Unknown form type: {type(form)}")
+            # Other forms can be added here as needed
+
+        # The points of all forms mapped in one batch
+        mapped = transformer.map_object(
+            [np.asarray(p, dtype=float).reshape(-1, 2) for p in points])
+
+        for (id, form), form_points in zip(forms, mapped):
+            id += id_offset
+            form_points = [Point2Da(x, y) for x, y in form_points]
+            if isinstance(form, Circle):
                 dest_pf.put_form(id, Circle(
                     color=form.color,
-                    center=Point2Da(center[0], center[1]),
+                    center=form_points[0],
                     radius=form.radius,
                     fill=form.fill
                 ))
             elif isinstance(form, Polygon):
                 dest_pf.put_form(id, Polygon(
                     color=form.color,
-                    points=[transformer.map_point(p) for p in form.points]
+                    points=form_points
                 ))
             elif isinstance(form, Text):
                 dest_pf.put_form(id, Text(
                     color=form.color,
-                    position=transformer.map_point(form.position),
+                    position=form_points[0],
                     text=form.text,
                     size=form.size
                 ))
-            else:
-                raise ValueError(f"Unknown form type: {type(form)}")
-            # Other forms can be added here as needed
 
+        if trace is not None:
+            trace.mark("transform")
         return dest_pf
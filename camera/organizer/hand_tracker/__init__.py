@@ -1,61 +1,301 @@
+import time
+
 import cv2
-import mediapipe as mp
+import numpy as np
 
 from ..datastructures import Point2Da
+from ..latency import FrameTrace
+from ..transformer import HomographyTransformer
+from .backends import BACKENDS, HandBackend, create_backend
+from .detections import HAND_CONNECTIONS, HandDetections
+
+
+def draw_hands(frame: cv2.Mat, hands) -> cv2.Mat:
+    """
+    Draw hands given as 21 pixel landmarks each onto a frame, in place.
+    :param hands: Landmarks per hand, e.g. HandDetections.landmarks.
+    """
+    for hand in hands:
+        points = [(int(round(p[0])), int(round(p[1]))) for p in hand]
+        for start, end in HAND_CONNECTIONS:
+            cv2.line(frame, points[start], points[end], (0, 0, 255), 2)
+        for point in points:
+            cv2.circle(frame, point, 4, (0, 255, 0), 2)
+    return frame
+
+
+def table_region(cam_to_pf: HomographyTransformer, table_width: float, table_height: float,
+                 frame_width: int, frame_height: int, margin: float = 0.1) -> tuple[int, int, int, int]:
+    """
+    Bounding box of the table in the camera image, for cropping the hand detection.
+    :param cam_to_pf: Camera to table homography.
+    :param margin: Padding relative to the box size, so hands reaching in from the edge are still found.
+    :return: (x0, y0, x1, y1) in pixels, clipped to the frame.
+    """
+    pf_to_cam = cam_to_pf.inverse()
+    corners = pf_to_cam.map_batch([[0, 0], [table_width, 0],
+                                   [0, table_height], [table_width, table_height]])
+    (min_x, min_y), (max_x, max_y) = corners.min(axis=0), corners.max(axis=0)
+    pad_x, pad_y = (max_x - min_x) * margin, (max_y - min_y) * margin
+    x0, y0 = max(int(min_x - pad_x), 0), max(int(min_y - pad_y), 0)
+    x1 = min(int(np.ceil(max_x + pad_x)) + 1, frame_width)
+    y1 = min(int(np.ceil(max_y + pad_y)) + 1, frame_height)
+    if x1 <= x0 or y1 <= y0:
+        raise ValueError(
+            f"Table does not overlap the {frame_width}x{frame_height} camera image.")
+    return x0, y0, x1, y1
+
+
+class _Track:
+    """
+    Last known state of a tracked hand.
+    """
+
+    def __init__(self, landmarks: np.ndarray, velocities: np.ndarray, last_seen: float):
+        self.landmarks = landmarks
+        self.velocities = velocities
+        self.last_seen = last_seen
 
 
 class HandTracker:
-    def __init__(self):
-        self.mp_hands = mp.solutions.hands
-        self.mp_draw = mp.solutions.drawing_utils
-
-        self.hands_model = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5
-        )
-
-        self.last_hand_landmarks = None
+    """
+    Hand detection with a choice of backends, MediaPipe by default.
+
+    With an `idle_rate` the model only runs that many times per second while
+    no hand is in view. As soon as a hand is found it runs on every frame
+    again, and keeps doing so until no hand was seen for `idle_after`
+    seconds, so the tracking between frames is not interrupted.
+
+    With a `roi` only that part of the frame is passed to the model, the
+    landmarks are still returned in full-frame pixels.
+
+    Every hand gets a track id that stays the same across frames. Hands are
+    matched to the tracks of earlier frames by their predicted centroid,
+    nearest first, within `track_gate` hand sizes. A track survives
+    `track_timeout` seconds without a detection, so short dropouts keep the
+    id. The velocity of every landmark is estimated per track and smoothed
+    exponentially.
+    """
+
+    def __init__(self, idle_rate: float = 0.0, idle_after: float = 0.5,
+                 roi: tuple[int, int, int, int] | None = None, velocity_smoothing: float = 0.5,
+                 track_gate: float = 1.5, track_timeout: float = 0.5, track_id_offset: int = 0,
+                 backend: str | HandBackend = "mediapipe"):
+        """
+        :param backend: Name of the detection backend (see BACKENDS) or a backend instance.
+        :param idle_rate: Detections per second without hands, 0 to run on every frame.
+        :param idle_after: Seconds without hands before dropping to the idle rate.
+        :param roi: (x0, y0, x1, y1) region to detect in, e.g. from table_region().
+        :param velocity_smoothing: Weight of the newest velocity measurement, 1 for no smoothing.
+        :param track_gate: Furthest a hand may move between detections, in hand sizes (wrist to middle finger base).
+        :param track_timeout: Seconds a track is kept without a detection.
+        :param track_id_offset: First track id, keeps the ids of several trackers apart.
+        """
+        self.roi = roi
+        self.velocity_smoothing = velocity_smoothing
+        self.track_gate = track_gate
+        self.track_timeout = track_timeout
+        self._tracks: dict[int, _Track] = {}
+        self._next_track_id = track_id_offset
+        self.idle_interval = 1.0 / idle_rate if idle_rate > 0 else 0.0
+        self.idle_after = idle_after
+        self._last_run: float | None = None
+        self._last_hand: float | None = None
+        self.inferences = 0
+        self.idle_skips = 0
+
+        self.backend = create_backend(backend)
+
         self.last_frame_shape = (0, 0)  # (height, width)
+        self.hands = HandDetections.empty()  # Hands of the last frame, in pixels
 
-    def detect_hands(self, frame: cv2.Mat) -> cv2.Mat:
-        frame = frame.copy()
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = self.hands_model.process(rgb_frame)
+    @property
+    def idle(self) -> bool:
+        """
+        Whether detection currently runs at the idle rate.
+        """
+        return self.idle_interval > 0 and (
+            self._last_hand is None or self._last_run - self._last_hand > self.idle_after)
+
+    def process(self, frame: cv2.Mat, trace: FrameTrace | None = None,
+                timestamp: float | None = None) -> bool:
+        """
+        Run hand detection on a frame without annotating it.
+        :param timestamp: Capture time of the frame, now if None.
+        :return: False if the frame was skipped because no hands are in view.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if self._last_run is not None and self.idle \
+                and timestamp - self._last_run < self.idle_interval:
+            self.idle_skips += 1
+            if trace is not None:
+                trace.mark("hands")
+            return False
+        self._last_run = timestamp
 
-        self.last_hand_landmarks = result.multi_hand_landmarks
-        # Save frame shape for pixel conversion
+        x0, y0 = 0, 0
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            frame = frame[y0:y1, x0:x1]
+
+        hands = self.backend.detect(frame)
+        if trace is not None:
+            trace.mark("hands")
+
+        # Frame shape of the crop if there is one
         self.last_frame_shape = frame.shape[:2]
+        hands.landmarks += np.array([x0, y0], dtype=np.float32)
+        self.hands = hands
+        self._track(self.hands, timestamp)
+        self.inferences += 1
+        if len(self.hands):
+            self._last_hand = timestamp
+        return True
+
+    def _track(self, hands: HandDetections, timestamp: float) -> None:
+        """
+        Assign track ids to `hands` and fill their velocities.
+        """
+        self._tracks = {id: track for id, track in self._tracks.items()
+                        if timestamp - track.last_seen <= self.track_timeout}
+        ids = list(self._tracks)
+        assigned = np.full(len(hands), -1, dtype=np.int64)
+
+        if len(hands) and ids:
+            tracks = [self._tracks[id] for id in ids]
+            # Where the tracked hands should be by now
+            expected = np.array([(track.landmarks + track.velocities * (timestamp - track.last_seen)).mean(axis=0)
+                                 for track in tracks])
+            centroids = hands.landmarks.mean(axis=1)
+            distance = np.linalg.norm(
+                centroids[:, None] - expected[None], axis=2)
+            hand_size = np.linalg.norm(
+                hands.landmarks[:, 9] - hands.landmarks[:, 0], axis=1)
+            distance[distance > self.track_gate * hand_size[:, None]] = np.inf
 
-        if self.last_hand_landmarks:
-            for hand_landmarks in self.last_hand_landmarks:
-                self.mp_draw.draw_landmarks(
-                    frame,
-                    hand_landmarks,
-                    self.mp_hands.HAND_CONNECTIONS,
-                    self.mp_draw.DrawingSpec(
-                        color=(0, 255, 0), thickness=2, circle_radius=4),
-                    self.mp_draw.DrawingSpec(color=(0, 0, 255), thickness=2)
-                )
+            # Closest pairs first, each hand and track used once
+            taken = np.zeros(len(ids), dtype=bool)
+            for flat in np.argsort(distance, axis=None):
+                i, j = divmod(int(flat), len(ids))
+                if not np.isfinite(distance[i, j]):
+                    break
+                if assigned[i] < 0 and not taken[j]:
+                    assigned[i] = ids[j]
+                    taken[j] = True
 
-        return frame
+        for i in range(len(hands)):
+            track = self._tracks.get(int(assigned[i]))
+            if track is None:
+                assigned[i] = self._next_track_id
+                self._next_track_id += 1
+            elif timestamp > track.last_seen:
+                velocity = (hands.landmarks[i] - track.landmarks) / \
+                    (timestamp - track.last_seen)
+                hands.velocities[i] = self.velocity_smoothing * velocity + \
+                    (1 - self.velocity_smoothing) * track.velocities
+            self._tracks[int(assigned[i])] = _Track(
+                hands.landmarks[i], hands.velocities[i], timestamp)
+        hands.track_ids = assigned
+
+    def detect_hands(self, frame: cv2.Mat, trace: FrameTrace | None = None,
+                     timestamp: float | None = None, annotate: bool = True) -> cv2.Mat | None:
+        """
+        Detect hands and return an annotated copy of the frame.
+        :param annotate: Skip the copy and drawing and return None, for headless use.
+        """
+        self.process(frame, trace, timestamp)
+        if not annotate:
+            return None
+
+        # Draw on a copy, the frame may be a borrowed camera buffer
+        frame = frame.copy()
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            cv2.rectangle(frame, (x0, y0), (x1 - 1, y1 - 1), (255, 0, 0), 1)
+        # Landmarks are in full-frame pixels, also with a crop
+        return draw_hands(frame, self.hands.landmarks)
 
     def get_hand_positions(self) -> list[list[Point2Da]]:
-        if not self.last_hand_landmarks:
-            return []
-
-        height, width = self.last_frame_shape
-        hand_positions = []
-
-        for hand_landmarks in self.last_hand_landmarks:
-            landmarks = [
-                Point2Da(
-                    x=int(landmark.x * width),
-                    y=int(landmark.y * height)
-                )
-                for landmark in hand_landmarks.landmark
-            ]
-            hand_positions.append(landmarks)
-
-        return hand_positions
+        """
+        The landmarks of the last frame as Point2Da lists, prefer `hands`.
+        """
+        return [[Point2Da(x=int(x), y=int(y)) for x, y in hand]
+                for hand in self.hands.landmarks]
+
+
+class HandMerger:
+    """
+    One track id per physical hand across several cameras.
+
+    Every camera's HandTracker numbers its hands in its own id range, so a
+    hand seen by two cameras would have two ids. Hands of different cameras
+    whose table space centroids are within `gate` hand sizes are the same
+    hand, nearest first, and all get the id that hand was known by first.
+    A camera picking up or losing a hand that another camera sees therefore
+    does not change its id.
+    """
+
+    def __init__(self, gate: float = 1.0, timeout: float = 0.5):
+        """
+        :param gate: Furthest apart the views of one hand may be, in hand sizes (wrist to middle finger base).
+        :param timeout: Seconds an id is remembered after its camera track was last seen.
+        """
+        self.gate = gate
+        self.timeout = timeout
+        # Camera track id to the id of the hand, and when it was last seen
+        self._aliases: dict[int, int] = {}
+        self._last_seen: dict[int, float] = {}
+        # When each hand id was first seen, the oldest one wins when views merge
+        self._first_seen: dict[int, float] = {}
+
+    def merge(self, views: list[HandDetections], timestamp: float) -> HandDetections:
+        """
+        Combine the hands of all cameras, in table coordinates.
+        :return: All detections, the views of one hand share its track id.
+        """
+        self._last_seen = {id: last for id, last in self._last_seen.items()
+                           if timestamp - last <= self.timeout}
+        self._aliases = {id: alias for id, alias in self._aliases.items()
+                         if id in self._last_seen}
+        self._first_seen = {alias: first for alias, first in self._first_seen.items()
+                            if alias in self._aliases.values()}
+        hands = HandDetections.concatenate(views)
+        if not len(hands):
+            return hands
+
+        camera = np.repeat(np.arange(len(views)), [len(view) for view in views])
+        centroids = hands.landmarks.mean(axis=1)
+        hand_size = np.linalg.norm(
+            hands.landmarks[:, 9] - hands.landmarks[:, 0], axis=1)
+        distance = np.linalg.norm(centroids[:, None] - centroids[None], axis=2)
+        gate = self.gate * np.maximum(hand_size[:, None], hand_size[None])
+        # A camera sees each hand once, only match views of different cameras
+        distance[(distance > gate) | (camera[:, None] == camera[None])] = np.inf
+
+        # Closest pairs first, a hand has at most one view per camera
+        group = np.arange(len(hands))
+        for flat in np.argsort(distance, axis=None):
+            i, j = divmod(int(flat), len(hands))
+            if not np.isfinite(distance[i, j]):
+                break
+            gi, gj = group[i], group[j]
+            if gi == gj or np.intersect1d(camera[group == gi], camera[group == gj]).size:
+                continue
+            group[group == gj] = gi
+
+        track_ids = hands.track_ids.copy()
+        for g in np.unique(group):
+            members = hands.track_ids[group == g]
+            known = [self._aliases[int(id)] for id in members if int(id) in self._aliases]
+            if known:
+                alias = min(known, key=self._first_seen.__getitem__)
+            else:
+                alias = int(members[0])
+                self._first_seen[alias] = timestamp
+            track_ids[group == g] = alias
+            for id in members:
+                self._aliases[int(id)] = alias
+                self._last_seen[int(id)] = timestamp
+        hands.track_ids = track_ids
+        return hands
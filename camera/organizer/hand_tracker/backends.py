@@ -0,0 +1,229 @@
+import cv2
+import numpy as np
+
+from .detections import HandDetections
+
+
+class HandBackend:
+    """
+    A hand detector behind HandTracker.
+
+    Backends find the hands in a BGR image and return their 21 landmarks in
+    the pixels of that image. Cropping, tracking, velocities and the idle
+    rate are handled by HandTracker for all backends alike.
+    """
+
+    name = "backend"
+
+    def detect(self, frame: np.ndarray) -> HandDetections:
+        raise NotImplementedError("Subclasses must implement detect method.")
+
+
+class MediaPipeBackend(HandBackend):
+    """
+    MediaPipe Hands, accurate but needs about one CPU core at 15 fps.
+    """
+
+    name = "mediapipe"
+
+    def __init__(self, max_num_hands: int = 2, min_detection_confidence: float = 0.7,
+                 min_tracking_confidence: float = 0.5):
+        # Imported here so stations using another backend don't need MediaPipe
+        import mediapipe as mp
+
+        self.hands_model = mp.solutions.hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_num_hands,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+        self._rgb_frame = None  # Reused conversion buffer
+
+    def detect(self, frame: np.ndarray) -> HandDetections:
+        if self._rgb_frame is None or self._rgb_frame.shape != frame.shape:
+            self._rgb_frame = np.empty_like(frame)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_frame)
+        result = self.hands_model.process(rgb_frame)
+        if not result.multi_hand_landmarks:
+            return HandDetections.empty()
+
+        height, width = frame.shape[:2]
+        landmarks = np.array([[(landmark.x, landmark.y) for landmark in hand.landmark]
+                              for hand in result.multi_hand_landmarks], dtype=np.float32)
+        landmarks *= np.array([width, height], dtype=np.float32)
+
+        handedness = []
+        scores = np.zeros(len(landmarks), dtype=np.float32)
+        for i, classification in enumerate(result.multi_handedness or []):
+            handedness.append(classification.classification[0].label)
+            scores[i] = classification.classification[0].score
+        handedness += ["Unknown"] * (len(landmarks) - len(handedness))
+        return HandDetections(landmarks, handedness, scores)
+
+
+class ContourBackend(HandBackend):
+    """
+    Lightweight hand detection for small PCs without MediaPipe.
+
+    A running average of the empty table, learned from the first frames,
+    separates hands and arms from it. Only large foreground blobs that reach
+    in from the border of the image, as an arm does, count as hands. The
+    background keeps learning everywhere except under the hands, so anything
+    else that changes on the table, like a PCB carrier put down or a new
+    projected overlay, fades into it within a few frames. Pixels that stay
+    foreground for `fade_after` detections fade as well, even under a hand.
+
+    The fingertips of a hand are the convex hull points furthest from the
+    palm center, the wrist is where the blob leaves the image. The other
+    landmarks are placed between palm and fingertips, so zone tests work as
+    with MediaPipe, but the finger joints are only approximate. Missing
+    fingers reuse the index tip, which keeps the palm width at zero so
+    pinches are never detected.
+    """
+
+    name = "contour"
+
+    def __init__(self, max_num_hands: int = 2, scale: float = 0.5, min_area: float = 0.01,
+                 threshold: float = 30, learning_rate: float = 0.002, fade_rate: float = 0.1,
+                 fade_after: int = 150, warmup: int = 30):
+        """
+        :param scale: Scale the image is processed at.
+        :param min_area: Smallest blob counted as a hand, relative to the image area.
+        :param threshold: Smallest difference to the background in any color channel that is foreground.
+        :param learning_rate: How fast the background adapts to slow changes like daylight.
+        :param fade_rate: How fast foreground that is not a hand fades into the background.
+        :param fade_after: Detections a pixel may stay foreground under a hand before it fades.
+        :param warmup: Frames used only to learn the background, the table should be empty then.
+        """
+        self.max_num_hands = max_num_hands
+        self.scale = scale
+        self.min_area = min_area
+        self.threshold = threshold
+        self.learning_rate = learning_rate
+        self.fade_rate = fade_rate
+        self.fade_after = fade_after
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        self._background: np.ndarray | None = None
+        # Consecutive detections each pixel has been foreground
+        self._foreground_age: np.ndarray | None = None
+        self._warmup = warmup
+
+    def detect(self, frame: np.ndarray) -> HandDetections:
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale,
+                           interpolation=cv2.INTER_AREA)
+        if self._background is None or self._background.shape != small.shape:
+            self._background = small.astype(np.float32)
+            self._foreground_age = np.zeros(small.shape[:2], dtype=np.uint16)
+        if self._warmup > 0:
+            self._warmup -= 1
+            cv2.accumulateWeighted(small, self._background, 0.1)
+            return HandDetections.empty()
+
+        difference = cv2.absdiff(small, cv2.convertScaleAbs(self._background))
+        mask = np.where(difference.max(axis=2) > self.threshold,
+                        255, 0).astype(np.uint8)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self._kernel)
+
+        contours, _ = cv2.findContours(
+            mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = self.min_area * mask.shape[0] * mask.shape[1]
+        contours = sorted((c for c in contours
+                           if cv2.contourArea(c) >= min_area and self._on_border(c, mask.shape).any()),
+                          key=cv2.contourArea, reverse=True)[:self.max_num_hands]
+        self._learn(small, mask, contours)
+        if not contours:
+            return HandDetections.empty()
+
+        landmarks = np.stack([self._landmarks(c.reshape(-1, 2).astype(np.float32), mask.shape)
+                              for c in contours])
+        # Pixel centers are at integer coordinates in both images
+        landmarks = (landmarks + 0.5) / self.scale - 0.5
+        return HandDetections(landmarks.astype(np.float32), ["Unknown"] * len(landmarks),
+                              np.zeros(len(landmarks), dtype=np.float32))
+
+    def _learn(self, small: np.ndarray, mask: np.ndarray, hands: list) -> None:
+        """
+        Update the background, except under hands that have not been still for too long.
+        """
+        foreground = mask > 0
+        self._foreground_age = np.where(
+            foreground, np.minimum(self._foreground_age + 1, self.fade_after), 0).astype(np.uint16)
+        hand_mask = np.zeros_like(mask)
+        cv2.drawContours(hand_mask, hands, -1, 255, cv2.FILLED)
+        frozen = (hand_mask > 0) & (self._foreground_age < self.fade_after)
+
+        cv2.accumulateWeighted(small, self._background, self.learning_rate,
+                               mask=np.where(foreground, 0, 255).astype(np.uint8))
+        cv2.accumulateWeighted(small, self._background, self.fade_rate,
+                               mask=np.where(foreground & ~frozen, 255, 0).astype(np.uint8))
+
+    @staticmethod
+    def _on_border(contour: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+        """
+        Which points of a contour touch the image border.
+        """
+        height, width = shape[:2]
+        contour = contour.reshape(-1, 2)
+        return (contour[:, 0] <= 1) | (contour[:, 1] <= 1) | \
+            (contour[:, 0] >= width - 2) | (contour[:, 1] >= height - 2)
+
+    @staticmethod
+    def _landmarks(contour: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+        """
+        Approximate the 21 landmarks of a hand blob that reaches in from the border.
+        """
+        on_border = ContourBackend._on_border(contour, shape)
+
+        moments = cv2.moments(contour)
+        if moments["m00"] > 0:
+            palm = np.array([moments["m10"], moments["m01"]],
+                            dtype=np.float32) / moments["m00"]
+        else:
+            palm = contour.mean(axis=0)
+
+        # Fingertips: hull points far from the palm, at least a palm radius apart
+        hull = cv2.convexHull(contour).reshape(-1, 2)
+        distance = np.linalg.norm(hull - palm, axis=1)
+        # Points at the image border belong to the arm, not to fingers
+        distance[ContourBackend._on_border(hull, shape)] = 0
+        spacing = distance.max() / 4
+        tips = []
+        for i in np.argsort(-distance):
+            if distance[i] < distance.max() / 2 or len(tips) == 5:
+                break
+            if all(np.linalg.norm(hull[i] - tip) > spacing for tip in tips):
+                tips.append(hull[i])
+        index_tip = tips[0]
+
+        wrist = contour[on_border].mean(axis=0)
+
+        # Thumb, index, middle, ring and pinky, the index is the furthest tip
+        finger_tips = [tips[1] if len(tips) > 1 else index_tip, index_tip] + \
+            [tips[k] if len(tips) > k else index_tip for k in (2, 3, 4)]
+        landmarks = np.empty((21, 2), dtype=np.float32)
+        landmarks[0] = wrist
+        for finger, tip in enumerate(finger_tips):
+            base = palm + 0.25 * (tip - palm)
+            for joint in range(4):
+                landmarks[1 + finger * 4 + joint] = base + \
+                    (tip - base) * joint / 3
+        return landmarks
+
+
+BACKENDS: dict[str, type[HandBackend]] = {
+    MediaPipeBackend.name: MediaPipeBackend,
+    ContourBackend.name: ContourBackend,
+}
+
+
+def create_backend(backend: str | HandBackend) -> HandBackend:
+    """
+    A backend by name, see BACKENDS, or the given instance.
+    """
+    if isinstance(backend, HandBackend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown hand tracking backend: {backend}. Choose from {', '.join(BACKENDS)}.")
+    return BACKENDS[backend]()
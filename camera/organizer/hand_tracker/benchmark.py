@@ -0,0 +1,172 @@
+"""
+Compare hand tracking backends on recorded sessions.
+
+Runs every backend over the same recordings and reports its time per frame,
+how often it found hands and how well it agrees with the first backend.
+With --static_check every backend also runs on a synthetic table where a
+PCB carrier and a projected overlay appear and stay, which must not be
+taken for hands, before an arm reaches in.
+
+    python -m organizer.hand_tracker.benchmark session.avi --backends mediapipe contour
+    python -m organizer.hand_tracker.benchmark --static_check --backends contour
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from ..camera.replay import load_timestamps
+from . import BACKENDS, HandTracker
+
+
+class BackendResult:
+    """
+    Timing and detections of one backend on one recording.
+    """
+
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.times: list[float] = []
+        # (n_hands, 21, 2) landmarks per frame
+        self.hands: list[np.ndarray] = []
+
+    @property
+    def frames(self) -> int:
+        return len(self.times)
+
+    def agreement(self, reference: 'BackendResult') -> tuple[float, float]:
+        """
+        Compare with another backend's run on the same frames.
+        :return: Share of frames where both agree on whether hands are present,
+        and the median distance in pixels between their closest index fingertips.
+        """
+        same_presence = []
+        tip_distances = []
+        for hands, reference_hands in zip(self.hands, reference.hands):
+            same_presence.append(bool(len(hands)) == bool(len(reference_hands)))
+            if len(hands) and len(reference_hands):
+                distance = np.linalg.norm(
+                    hands[:, None, 8] - reference_hands[None, :, 8], axis=2)
+                tip_distances.append(distance.min())
+        return (float(np.mean(same_presence)) if same_presence else 0.0,
+                float(np.median(tip_distances)) if tip_distances else float("nan"))
+
+
+def run_backend(video_file: str, backend: str, roi: tuple[int, int, int, int] | None = None,
+                max_frames: int | None = None) -> BackendResult:
+    """
+    Run one backend on every frame of a recording, at full rate.
+    """
+    timestamps = load_timestamps(video_file)
+    cap = cv2.VideoCapture(video_file)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video {video_file}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    tracker = HandTracker(roi=roi, backend=backend)
+    result = BackendResult(backend)
+    frame = None
+    while max_frames is None or result.frames < max_frames:
+        ret, frame = cap.read(frame)
+        if not ret:
+            break
+        index = result.frames
+        timestamp = timestamps[index] if timestamps is not None and index < len(timestamps) \
+            else index / fps
+
+        start = time.perf_counter()
+        tracker.process(frame, timestamp=timestamp)
+        result.times.append(time.perf_counter() - start)
+        result.hands.append(tracker.hands.landmarks)
+    cap.release()
+    return result
+
+
+def synthetic_table(frames: int = 600, width: int = 640, height: int = 480, seed: int = 0):
+    """
+    Frames of a table where things appear and stay, and later an arm reaches in.
+    :return: Generator of (frame, whether the arm is in view).
+    """
+    rng = np.random.default_rng(seed)
+    table = rng.integers(90, 130, (height, width, 3), dtype=np.uint8)
+    table = cv2.GaussianBlur(table, (0, 0), 3)
+    # Sensor noise, a few variants are enough
+    noisy = [np.clip(table + rng.normal(0, 3, table.shape), 0, 255).astype(np.uint8)
+             for _ in range(8)]
+    for index in range(frames):
+        frame = noisy[index % len(noisy)].copy()
+        if index >= 40:
+            # A PCB carrier put down in the middle of the table
+            cv2.rectangle(frame, (230, 190), (410, 290), (40, 60, 40), cv2.FILLED)
+        if index >= 80:
+            # A projected overlay reaching the edge of the image
+            cv2.rectangle(frame, (540, 20), (width - 1, 120), (60, 60, 230), cv2.FILLED)
+        arm = frames - 200 <= index < frames - 100
+        if arm:
+            # An arm with a hand reaching in from the bottom edge
+            reach = height - 40 - 2 * (index - (frames - 200))
+            cv2.rectangle(frame, (120, reach + 60), (180, height - 1), (150, 170, 210), cv2.FILLED)
+            cv2.ellipse(frame, (150, reach + 40), (45, 55), 0, 0, 360, (150, 170, 210), cv2.FILLED)
+        yield frame, arm
+
+
+def static_check(backend: str, frames: int = 600) -> None:
+    """
+    Report how a backend reacts to things that appear on the table and stay.
+    """
+    tracker = HandTracker(backend=backend)
+    false_frames = []
+    found = arm_frames = 0
+    for index, (frame, arm) in enumerate(synthetic_table(frames)):
+        tracker.process(frame, timestamp=index / 30)
+        if arm:
+            arm_frames += 1
+            found += bool(len(tracker.hands))
+        elif len(tracker.hands):
+            false_frames.append(index)
+    last = f", last at frame {false_frames[-1]}" if false_frames else ""
+    print(f"{backend:<12}static objects taken for hands on {len(false_frames)} of "
+          f"{frames - arm_frames} frames{last}, arm found on {found} of {arm_frames} frames")
+
+
+def report(video_file: str, results: list[BackendResult]) -> None:
+    print(f"\n{video_file}")
+    print(f"{'backend':<12}{'frames':>8}{'ms/frame':>10}{'p95 ms':>9}{'max fps':>9}"
+          f"{'w/ hands':>10}{'agree':>8}{'tip px':>8}")
+    for result in results:
+        times = np.array(result.times) * 1000
+        mean = times.mean() if len(times) else float("nan")
+        with_hands = np.mean([len(hands) > 0 for hands in result.hands]) if result.hands else 0.0
+        agree, tip = result.agreement(results[0])
+        print(f"{result.backend:<12}{result.frames:>8}{mean:>10.1f}"
+              f"{np.percentile(times, 95) if len(times) else float('nan'):>9.1f}"
+              f"{1000 / mean:>9.1f}{with_hands:>10.0%}{agree:>8.0%}{tip:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare hand tracking backends on recorded sessions")
+    parser.add_argument("videos", type=str, nargs="*", help="Recorded sessions")
+    parser.add_argument(
+        "--backends", type=str, nargs="+", choices=list(BACKENDS), default=list(BACKENDS),
+        help="Backends to compare, the first one is the reference (default: all)")
+    parser.add_argument(
+        "--roi", type=int, nargs=4, default=None, metavar=("X0", "Y0", "X1", "Y1"),
+        help="Only detect in this region, like the organizer does around the table")
+    parser.add_argument(
+        "--max_frames", type=int, default=None, help="Frames to use per recording (default: all)")
+    parser.add_argument(
+        "--static_check", action="store_true",
+        help="Also check that objects put on the table are not taken for hands")
+    args = parser.parse_args()
+    if not args.videos and not args.static_check:
+        parser.error("Give recorded sessions or --static_check")
+
+    if args.static_check:
+        print("\nSynthetic table")
+        for backend in args.backends:
+            static_check(backend)
+    for video in args.videos:
+        report(video, [run_backend(video, backend, args.roi, args.max_frames)
+                       for backend in args.backends])
@@ -0,0 +1,79 @@
+import numpy as np
+
+# Landmark pairs connected by a bone, as in MediaPipe's hand model
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+
+
+class HandDetections:
+    """
+    The hands found in one frame, as arrays.
+    """
+
+    def __init__(self, landmarks: np.ndarray, handedness: list[str], scores: np.ndarray,
+                 velocities: np.ndarray | None = None, track_ids: np.ndarray | None = None):
+        """
+        :param landmarks: (n_hands, 21, 2) float32 landmark positions.
+        :param handedness: "Left" or "Right" per hand.
+        :param scores: (n_hands,) confidence of the handedness classification.
+        :param velocities: (n_hands, 21, 2) landmark velocities per second, zero if None.
+        :param track_ids: (n_hands,) ids that stay the same for a hand across frames, -1 if None.
+        """
+        self.landmarks = landmarks
+        self.handedness = handedness
+        self.scores = scores
+        self.velocities = np.zeros_like(
+            landmarks) if velocities is None else velocities
+        self.track_ids = np.full(len(landmarks), -1, dtype=np.int64) \
+            if track_ids is None else track_ids
+
+    @staticmethod
+    def empty() -> 'HandDetections':
+        return HandDetections(np.empty((0, 21, 2), dtype=np.float32), [],
+                              np.empty(0, dtype=np.float32))
+
+    @staticmethod
+    def concatenate(detections: list['HandDetections']) -> 'HandDetections':
+        """
+        Merge the hands of several detections, e.g. of several cameras.
+        """
+        if not detections:
+            return HandDetections.empty()
+        return HandDetections(np.concatenate([d.landmarks for d in detections]),
+                              [h for d in detections for h in d.handedness],
+                              np.concatenate([d.scores for d in detections]),
+                              np.concatenate([d.velocities for d in detections]),
+                              np.concatenate([d.track_ids for d in detections]))
+
+    def transformed(self, transformer) -> 'HandDetections':
+        """
+        The same hands with all landmarks mapped in one batch, e.g. into table coordinates.
+        Velocities are mapped as the positions a tenth of a second ahead.
+        """
+        step = 0.1
+        landmarks = transformer.map_object(self.landmarks)
+        # Only used for the velocities, a fast or badly matched track may
+        # extrapolate onto the horizon, its velocity is dropped then
+        ahead = transformer.map_object(
+            self.landmarks + self.velocities * step, strict=False)
+        velocities = np.nan_to_num((ahead - landmarks) / step, nan=0.0)
+        return HandDetections(landmarks, self.handedness, self.scores,
+                              velocities, self.track_ids)
+
+    def predicted(self, seconds: float) -> 'HandDetections':
+        """
+        The hands extrapolated with their velocities, e.g. to the time they will be displayed.
+        """
+        return HandDetections((self.landmarks + self.velocities * seconds).astype(self.landmarks.dtype),
+                              self.handedness, self.scores, self.velocities, self.track_ids)
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def __repr__(self):
+        return f"HandDetections({list(zip(self.track_ids.tolist(), self.handedness))})"
@@ -0,0 +1,124 @@
+import numpy as np
+
+from . import HandDetections
+
+# MediaPipe hand landmark indices
+THUMB_TIP = 4
+INDEX_MCP = 5
+INDEX_TIP = 8
+PINKY_MCP = 17
+
+
+def pinch_state(landmarks: np.ndarray, touch_scale: float = 0.5) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Thumb-index pinches of all hands at once.
+
+    A hand pinches when its thumb and index tips are closer than
+    `touch_scale` times its palm width, so the test does not depend on how
+    far the hand is from the camera.
+    :param landmarks: (n_hands, 21, 2) landmarks.
+    :return: (n_hands,) pinch flags and (n_hands, 2) contact points between the tips.
+    """
+    thumb = landmarks[:, THUMB_TIP]
+    index = landmarks[:, INDEX_TIP]
+    palm_width = np.linalg.norm(
+        landmarks[:, PINKY_MCP] - landmarks[:, INDEX_MCP], axis=1)
+    tip_distance = np.linalg.norm(index - thumb, axis=1)
+    return tip_distance < palm_width * touch_scale, (thumb + index) / 2
+
+
+class GestureEngine:
+    """
+    Pinch-to-press buttons on arbitrary polygons.
+
+    A polygon is pressed while a pinch contact point lies inside it. Once it
+    has been pressed for `click_duration` seconds a single click is reported,
+    the next one needs the pinch to leave the polygon first. All hands are
+    tested against all polygons in one array operation.
+    """
+
+    def __init__(self, click_duration: float = 0.2, touch_scale: float = 0.5):
+        """
+        :param click_duration: Seconds a polygon must be pressed before it clicks.
+        :param touch_scale: Tip distance relative to the palm width that counts as a pinch.
+        """
+        self.click_duration = click_duration
+        self.touch_scale = touch_scale
+        self.names: list[str] = []
+        self._polygons: list[np.ndarray] = []
+        # Edges of all polygons padded to the same count, (n_polygons, n_edges, 2)
+        self._starts = np.empty((0, 0, 2))
+        self._ends = np.empty((0, 0, 2))
+        self._press_start = np.empty(0)
+        self._clicked = np.empty(0, dtype=bool)
+        # State of the last update
+        self.pinched = np.empty(0, dtype=bool)
+        self.contacts = np.empty((0, 2))
+        self.pressed = np.empty(0, dtype=bool)
+
+    def add_polygon(self, name: str, points) -> None:
+        """
+        Register a button polygon, in the coordinates of the hands passed to update().
+        """
+        if name in self.names:
+            raise ValueError(f"Polygon {name} is already registered.")
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) < 3:
+            raise ValueError(
+                f"Polygon {name} needs at least 3 points. Got {len(points)}.")
+        self.names.append(name)
+        self._polygons.append(points)
+
+        n_edges = max(len(polygon) for polygon in self._polygons)
+        starts = np.empty((len(self._polygons), n_edges, 2))
+        ends = np.empty_like(starts)
+        for i, polygon in enumerate(self._polygons):
+            # Padding edges have no length and are never crossed
+            starts[i, :] = polygon[0]
+            ends[i, :] = polygon[0]
+            starts[i, :len(polygon)] = polygon
+            ends[i, :len(polygon)] = np.roll(polygon, -1, axis=0)
+        self._starts, self._ends = starts, ends
+        self._press_start = np.append(self._press_start, np.nan)
+        self._clicked = np.append(self._clicked, False)
+        self.pressed = np.append(self.pressed, False)
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """
+        Point in polygon test of all points against all polygons, by ray casting.
+        :param points: (n_points, 2) points.
+        :return: (n_polygons, n_points) flags.
+        """
+        px = points[:, 0][None, None, :]
+        py = points[:, 1][None, None, :]
+        x0, y0 = self._starts[..., 0:1], self._starts[..., 1:2]
+        x1, y1 = self._ends[..., 0:1], self._ends[..., 1:2]
+        straddles = (y0 > py) != (y1 > py)
+        dy = np.where(y1 == y0, 1.0, y1 - y0)
+        crosses = straddles & (px < (x1 - x0) * (py - y0) / dy + x0)
+        return np.logical_xor.reduce(crosses, axis=1)
+
+    def update(self, hands: HandDetections, timestamp: float) -> list[str]:
+        """
+        Feed the hands of a frame.
+        :return: Names of the polygons that clicked in this frame.
+        """
+        self.pinched, self.contacts = pinch_state(
+            hands.landmarks, self.touch_scale)
+        if not self.names:
+            return []
+
+        self.pressed = self.contains(self.contacts[self.pinched]).any(axis=1)
+
+        starting = self.pressed & np.isnan(self._press_start)
+        self._press_start[starting] = timestamp
+        self._press_start[~self.pressed] = np.nan
+        self._clicked[~self.pressed] = False
+
+        clicks = self.pressed & ~self._clicked & \
+            (timestamp - self._press_start >= self.click_duration)
+        self._clicked |= clicks
+        return [self.names[i] for i in np.flatnonzero(clicks)]
+
+    def is_pressed(self, name: str) -> bool:
+        return bool(self.pressed[self.names.index(name)])
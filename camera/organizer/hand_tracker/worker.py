@@ -0,0 +1,169 @@
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import HandDetections, HandTracker
+
+
+class HandResult:
+    """
+    Hands detected by the worker process in one frame.
+    """
+
+    def __init__(self, frame_id: int, timestamp: float, hands: HandDetections, finished: float):
+        """
+        :param frame_id: Id the frame was submitted with.
+        :param timestamp: Timestamp the frame was submitted with, e.g. its capture time.
+        :param hands: The hands in pixels of the submitted frame.
+        :param finished: Wall-clock time the inference finished.
+        """
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.hands = hands
+        self.finished = finished
+
+    def __repr__(self):
+        return f"HandResult(frame_id={self.frame_id}, hands={len(self.hands)})"
+
+
+def _run(shm_name: str, shape: tuple, dtype: str, slots: int,
+         requests: multiprocessing.Queue, results: multiprocessing.Queue,
+         tracker_settings: dict) -> None:
+    """
+    Worker process: run the hand tracker on frames in shared memory slots.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((slots, *shape), dtype=np.dtype(dtype), buffer=shm.buf)
+    tracker = HandTracker(**tracker_settings)
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            slot, frame_id, timestamp = request
+            tracker.process(frames[slot], timestamp=timestamp)
+            results.put((slot, HandResult(frame_id, timestamp, tracker.hands, time.time())))
+    finally:
+        del frames
+        shm.close()
+
+
+class HandTrackerProcess:
+    """
+    Runs hand detection in a separate process, so it uses its own core
+    instead of adding to the time of the main loop.
+
+    Frames are copied into preallocated shared memory slots, only the slot
+    index goes through the queue and the results come back as HandDetections.
+    A slot is reused once the worker returned its result. submit() and
+    latest() never block: when all slots are in use the frame is skipped,
+    and latest() returns the newest finished result.
+    """
+
+    def __init__(self, slots: int = 2, **tracker_settings):
+        """
+        :param slots: Frames that may be in flight at once. With 1 the worker
+        always gets the newest frame but idles between submits, with 2 it
+        always has the next frame ready.
+        :param tracker_settings: Keyword arguments for the worker's HandTracker.
+        """
+        if slots < 1:
+            raise ValueError(f"Need at least 1 slot. Got {slots}.")
+        self.slots = slots
+        self.tracker_settings = tracker_settings
+        self._context = multiprocessing.get_context("spawn")
+        self._shm: shared_memory.SharedMemory | None = None
+        self._frames: np.ndarray | None = None
+        self._process = None
+        self._requests = None
+        self._results = None
+        self._free: list[int] = []
+        self._latest: HandResult | None = None
+        self.submitted = 0
+        self.skipped = 0
+
+    def _start(self, frame: np.ndarray) -> None:
+        """
+        Allocate the shared memory for frames like this one and start the worker.
+        """
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=frame.nbytes * self.slots)
+        self._frames = np.ndarray((self.slots, *frame.shape), dtype=frame.dtype,
+                                  buffer=self._shm.buf)
+        self._free = list(range(self.slots))
+        self._requests = self._context.Queue()
+        self._results = self._context.Queue()
+        process = self._context.Process(
+            target=_run, name="HandTracker", daemon=True,
+            args=(self._shm.name, frame.shape, frame.dtype.str, self.slots,
+                  self._requests, self._results, self.tracker_settings))
+        process.start()
+        # Only a started worker needs to be stopped in close()
+        self._process = process
+
+    def _collect(self) -> None:
+        """
+        Take all finished results off the queue and free their slots.
+        """
+        while True:
+            try:
+                slot, result = self._results.get_nowait()
+            except queue.Empty:
+                return
+            self._free.append(slot)
+            if self._latest is None or result.frame_id >= self._latest.frame_id:
+                self._latest = result
+
+    def submit(self, frame: np.ndarray, frame_id: int = 0, timestamp: float | None = None) -> bool:
+        """
+        Hand a frame to the worker without waiting for the result.
+        :param timestamp: Capture time of the frame, now if None.
+        :return: False if all slots were busy and the frame was skipped.
+        """
+        if self._process is None:
+            self._start(frame)
+        elif frame.shape != self._frames.shape[1:] or frame.dtype != self._frames.dtype:
+            raise ValueError(
+                f"Frame shape changed from {self._frames.shape[1:]} to {frame.shape}.")
+        if not self._process.is_alive():
+            raise RuntimeError("Hand tracker process has stopped.")
+
+        self._collect()
+        if not self._free:
+            self.skipped += 1
+            return False
+
+        if timestamp is None:
+            timestamp = time.time()
+        slot = self._free.pop(0)
+        np.copyto(self._frames[slot], frame)
+        self._requests.put((slot, frame_id, timestamp))
+        self.submitted += 1
+        return True
+
+    def latest(self) -> HandResult | None:
+        """
+        The newest finished result, or None if there is none yet.
+        """
+        if self._process is not None:
+            self._collect()
+        return self._latest
+
+    def close(self) -> None:
+        """
+        Stop the worker and free the shared memory.
+        """
+        if self._process is not None:
+            self._requests.put(None)
+            self._process.join(timeout=2)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._shm is not None:
+            self._frames = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
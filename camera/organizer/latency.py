@@ -0,0 +1,78 @@
+import time
+
+
+class FrameTrace:
+    """
+    Capture time and per-stage timestamps of one frame on its way from the
+    camera to the MQTT publish. All times are wall-clock seconds, so the
+    display can compare them with its own clock.
+
+    The frame's own `timestamp` is kept apart, for replayed sessions it is
+    the recorded capture time and unrelated to the wall clock.
+    """
+
+    def __init__(self, frame_id: int, captured: float, sources: dict[str, dict] | None = None,
+                 timestamp: float | None = None):
+        """
+        :param frame_id: Id of the frame, or of the frame set with several cameras.
+        :param captured: Wall-clock time the oldest frame involved was read.
+        :param sources: Frame id, read time and capture timestamp per camera.
+        :param timestamp: Capture timestamp of the oldest frame, the same as captured if None.
+        """
+        self.frame_id = frame_id
+        self.captured = captured
+        self.timestamp = captured if timestamp is None else timestamp
+        self.sources = sources or {}
+        self.stages: dict[str, float] = {}
+
+    def mark(self, stage: str) -> None:
+        """
+        Record that a stage has finished with this frame.
+        """
+        self.stages[stage] = time.time()
+
+    @property
+    def latency(self) -> float:
+        """
+        Seconds from capture to the last recorded stage.
+        """
+        if not self.stages:
+            return 0.0
+        return max(self.stages.values()) - self.captured
+
+    def to_dict(self) -> dict:
+        return {
+            "frame_id": self.frame_id,
+            "captured": self.captured,
+            "timestamp": self.timestamp,
+            "sources": self.sources,
+            "stages": self.stages,
+        }
+
+    def __repr__(self):
+        return f"FrameTrace(frame_id={self.frame_id}, latency={self.latency * 1000:.1f}ms)"
+
+
+class LatencyStats:
+    """
+    Running statistics of capture-to-publish latency.
+    """
+
+    def __init__(self, smoothing: int = 30):
+        self._alpha = 1.0 / smoothing
+        self.count = 0
+        self.smoothed = 0.0
+        self.max = 0.0
+
+    def add(self, trace: FrameTrace) -> None:
+        latency = trace.latency
+        if self.count == 0:
+            self.smoothed = latency
+        else:
+            self.smoothed += self._alpha * (latency - self.smoothed)
+        self.max = max(self.max, latency)
+        self.count += 1
+
+    def __str__(self):
+        return (f"latency over {self.count} frames: "
+                f"smoothed {self.smoothed * 1000:.1f}ms, max {self.max * 1000:.1f}ms")
@@ -7,6 +7,7 @@ import paho.mqtt.client as mqtt
 from paho.mqtt.client import MQTTMessage
 
 from ..datastructures import Circle, Messages, Playfield, Polygon, Text
+from ..latency import FrameTrace
 
 
 class MqttHandler:
@@ -50,6 +51,17 @@ class MqttHandler:
     def send(self, payload: str):
         self.client.publish(self.topic, payload)
 
+    def send_playfield(self, playfield: Playfield, trace: FrameTrace | None = None):
+        """
+        Publish a playfield, with the frame trace in its "meta" field so the
+        display can compute the latency from capture to projection.
+        """
+        if trace is None:
+            self.send(playfield.to_json())
+            return
+        trace.mark("publish")
+        self.send(playfield.to_json(meta=trace.to_dict()))
+
     def disconnect(self):
         self.client.loop_stop()
         self.client.disconnect()
@@ -4,13 +4,52 @@ import cv2
 import numpy as np
 
 from ..datastructures import Point2Da
-from .asuco import find_codes
+from ..latency import FrameTrace
+from ..transformer import HomographyTransformer
+from .asuco import Code, MarkerDetector, find_codes
+
+
+def fuse_codes(detections: list[tuple[dict[int, Code], HomographyTransformer]]) -> dict[int, Code]:
+    """
+    Merge marker detections of several cameras into table space.
+    :param detections: One (codes, cam_to_pf) pair per camera.
+    :return: Every detected marker with center and corners in table
+    coordinates, averaged over the cameras that saw it.
+    """
+    sums: dict[int, np.ndarray] = {}
+    counts: dict[int, int] = {}
+    for codes, cam_to_pf in detections:
+        for id, code in codes.items():
+            # Center and corners mapped together as one (5, 2) batch
+            points = cam_to_pf.map_batch(
+                np.vstack([code.center, code.corners]))
+            if id in sums:
+                sums[id] += points
+                counts[id] += 1
+            else:
+                sums[id] = points
+                counts[id] = 1
+
+    fused = {}
+    for id, points in sums.items():
+        points = points / counts[id]
+        fused[id] = Code(id, Point2Da(points[0, 0], points[0, 1]), points[1:])
+    return fused
 
 
 class FrameProcessor:
-    def __init__(self, frame: np.ndarray | None = None):
+    def __init__(self, frame: np.ndarray | None = None, trace: FrameTrace | None = None,
+                 detector: MarkerDetector | None = None, gray: np.ndarray | None = None):
+        """
+        :param detector: Long-lived marker detector, a shared default one if None.
+        :param gray: Grayscale version of the frame, converted here if None.
+        The grayscale image is kept in self.gray for other stages.
+        """
         self.frame = frame
-        self.codes = find_codes(self.frame)
+        self.gray = gray if gray is not None else MarkerDetector.to_gray(frame)
+        self.codes = find_codes(self.frame, detector, self.gray)
+        if trace is not None:
+            trace.mark("markers")
 
         # ordered_codes = [
         #     self.codes.get(10),
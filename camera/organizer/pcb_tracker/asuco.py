@@ -1,13 +1,16 @@
 import cv2
 import cv2.aruco as aruco
+import numpy as np
 
 from ..datastructures import Point2Da
 
 
 class Code:
-    def __init__(self, id: int, center: Point2Da | None = None):
+    def __init__(self, id: int, center: Point2Da | None = None, corners: np.ndarray | None = None):
         self.id = id
         self.center = center
+        # (4, 2) marker corners in ArUco order: clockwise from the marker's top-left
+        self.corners = corners
 
     def __str__(self):
         return f"Code: {self.id}"
@@ -16,31 +19,200 @@ class Code:
         return f"Code({self.id})"
 
 
-def find_codes(
-        frame,
-        aruco_dict=aruco.getPredefinedDictionary(aruco.DICT_4X4_50),
-        parameters=aruco.DetectorParameters()) -> dict[str, Code]:
+class MarkerDetector:
     """
-    Find ArUco codes in the given frame.
+    A long-lived ArUco detector.
+
+    Building the dictionary, parameters and cv2.aruco.ArucoDetector is done
+    once here instead of on every frame. Detection runs on a grayscale image
+    that the caller can share with other stages.
+
+    In tracking mode only padded windows around the markers found in the
+    previous frame are searched. The full frame is scanned again every
+    `full_scan_interval` frames and whenever a tracked marker is lost.
+
+    With a `pyramid_scale` below 1 full-frame scans find the markers on a
+    downscaled image and then refine their corners with subpixel accuracy on
+    the full-resolution image, which keeps the cost nearly flat as camera
+    resolution grows.
     """
 
-    codes = {}
+    def __init__(self, dictionary: str | int = "DICT_4X4_50",
+                 parameters: aruco.DetectorParameters | dict | None = None,
+                 tracking: bool = False, full_scan_interval: int = 30, roi_padding: float = 1.0,
+                 pyramid_scale: float = 1.0):
+        """
+        :param dictionary: Predefined dictionary, by name (e.g. "DICT_4X4_50") or cv2.aruco constant.
+        :param parameters: DetectorParameters, or a dict of DetectorParameters attributes to override.
+        :param tracking: Search around the last known markers instead of the full frame.
+        :param full_scan_interval: Frames between forced full-frame scans in tracking mode.
+        :param roi_padding: Padding around a tracked marker, relative to its size.
+        :param pyramid_scale: Scale of the image full-frame scans detect on, 1 to disable.
+        """
+        if not 0 < pyramid_scale <= 1:
+            raise ValueError(
+                f"Pyramid scale must be in (0, 1]. Got {pyramid_scale}.")
+        if isinstance(dictionary, str):
+            if not dictionary.startswith("DICT_") or not hasattr(aruco, dictionary):
+                raise ValueError(f"Unknown ArUco dictionary: {dictionary}")
+            dictionary = getattr(aruco, dictionary)
+        self.dictionary = aruco.getPredefinedDictionary(dictionary)
+
+        if parameters is None or isinstance(parameters, dict):
+            overrides = parameters or {}
+            parameters = aruco.DetectorParameters()
+            for name, value in overrides.items():
+                if not hasattr(parameters, name):
+                    raise ValueError(f"Unknown ArUco detector parameter: {name}")
+                setattr(parameters, name, value)
+        self.parameters = parameters
+
+        self._detector = aruco.ArucoDetector(self.dictionary, self.parameters)
+
+        self.tracking = tracking
+        self.full_scan_interval = full_scan_interval
+        self.roi_padding = roi_padding
+        self.pyramid_scale = pyramid_scale
+        # Search window for the refinement covers the error of the downscaled corners
+        half_window = int(np.ceil(1 / pyramid_scale)) + 1
+        self._refine_window = (half_window, half_window)
+        self._refine_criteria = (
+            cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.01)
+        # Corners of the markers found in the last frame, by id
+        self._tracked: dict[int, np.ndarray] = {}
+        self._frames_since_full_scan = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+
+    @staticmethod
+    def to_gray(frame: np.ndarray) -> np.ndarray:
+        """
+        Convert a BGR frame to grayscale, frames that already are gray are returned as is.
+        """
+        if frame.ndim == 2:
+            return frame
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def _detect_corners(self, gray: np.ndarray, x0: int = 0, y0: int = 0) -> dict[int, np.ndarray]:
+        """
+        Run the detector on an image, offsetting the corners by (x0, y0).
+        :return: The (4, 2) corners of every detected marker, by id.
+        """
+        corners, ids, rejected = self._detector.detectMarkers(gray)
+        if ids is None:
+            return {}
+        # OpenCV versions differ in returning ids as (N, 1) or (N,)
+        ids = ids.reshape(-1)
+        offset = np.array([x0, y0], dtype=np.float32)
+        return {int(ids[i]): corners[i].reshape(4, 2) + offset for i in range(len(ids))}
+
+    def _detect_pyramid(self, gray: np.ndarray) -> dict[int, np.ndarray]:
+        """
+        Detect markers on a downscaled image and refine the corners at full resolution.
+        """
+        if self.pyramid_scale == 1:
+            return self._detect_corners(gray)
+
+        small = cv2.resize(gray, None, fx=self.pyramid_scale, fy=self.pyramid_scale,
+                           interpolation=cv2.INTER_AREA)
+        found = self._detect_corners(small)
+        if not found:
+            return found
+
+        ids = list(found)
+        # Pixel centers are at integer coordinates in both images
+        points = (np.stack([found[id] for id in ids]) + 0.5) / \
+            self.pyramid_scale - 0.5
+        points = points.reshape(-1, 1, 2).astype(np.float32)
+        cv2.cornerSubPix(gray, points, self._refine_window,
+                         (-1, -1), self._refine_criteria)
+        points = points.reshape(-1, 4, 2)
+        return {id: points[i] for i, id in enumerate(ids)}
 
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    def _search_windows(self, shape: tuple[int, int]) -> list[list[int]]:
+        """
+        Padded windows around the tracked markers, overlapping ones merged.
+        :return: [x0, y0, x1, y1] per window, clipped to the image.
+        """
+        height, width = shape[:2]
+        windows = []
+        for corners in self._tracked.values():
+            (min_x, min_y), (max_x, max_y) = corners.min(axis=0), corners.max(axis=0)
+            pad = max(max_x - min_x, max_y - min_y) * self.roi_padding + 8
+            windows.append([max(int(min_x - pad), 0), max(int(min_y - pad), 0),
+                            min(int(max_x + pad) + 1, width), min(int(max_y + pad) + 1, height)])
 
-    # Detect markers
-    corners, ids, rejected = cv2.aruco.ArucoDetector(
-        aruco_dict, parameters).detectMarkers(frame)
-    # corners, ids, rejected = aruco.detectMarkers(
-    #     gray, aruco_dict, parameters=parameters)
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(windows)):
+                for j in range(i + 1, len(windows)):
+                    a, b = windows[i], windows[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        windows[i] = [min(a[0], b[0]), min(a[1], b[1]),
+                                      max(a[2], b[2]), max(a[3], b[3])]
+                        del windows[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return windows
 
-    if ids is not None:
-        for i in range(len(ids)):
+    def _track(self, gray: np.ndarray) -> dict[int, np.ndarray]:
+        """
+        Find the markers of the last frame, falling back to a full scan if needed.
+        """
+        if self._tracked and self._frames_since_full_scan < self.full_scan_interval:
+            found: dict[int, np.ndarray] = {}
+            for x0, y0, x1, y1 in self._search_windows(gray.shape):
+                found.update(self._detect_corners(gray[y0:y1, x0:x1], x0, y0))
+            if all(id in found for id in self._tracked):
+                self.roi_scans += 1
+                self._frames_since_full_scan += 1
+                return found
+
+        self.full_scans += 1
+        self._frames_since_full_scan = 0
+        return self._detect_pyramid(gray)
+
+    def detect(self, gray: np.ndarray) -> dict[int, Code]:
+        """
+        Detect markers in a grayscale image.
+        """
+        if self.tracking:
+            corners = self._track(gray)
+            self._tracked = corners
+        else:
+            corners = self._detect_pyramid(gray)
+
+        codes = {}
+        for id, corner in corners.items():
             # Get the center of the marker
-            corner = corners[i][0]
             center = corner.mean(axis=0)
             center = Point2Da(center[0], center[1])
-            code = Code(ids[i][0], center)
+            code = Code(id, center, corner)
             codes[code.id] = code
 
-    return codes
+        return codes
+
+
+_default_detector: MarkerDetector | None = None
+
+
+def find_codes(frame, detector: MarkerDetector | None = None,
+               gray: np.ndarray | None = None) -> dict[int, Code]:
+    """
+    Find ArUco codes in the given frame.
+    :param detector: Detector to use, a shared DICT_4X4_50 detector if None.
+    :param gray: Grayscale version of the frame, if it was already converted.
+    """
+    global _default_detector
+    if detector is None:
+        if _default_detector is None:
+            _default_detector = MarkerDetector()
+        detector = _default_detector
+
+    if gray is None:
+        gray = MarkerDetector.to_gray(frame)
+
+    return detector.detect(gray)
@@ -0,0 +1,138 @@
+import json
+
+from ..datastructures import Playfield
+from ..transformer import HomographyTransformer
+from .asuco import Code
+from .pose import PoseFilter
+from .registration import BoardLayout, register_board
+
+# Carrier corner (index into TL, TR, BL, BR) holding each board corner,
+# for boards mounted rotated clockwise on their carrier
+_ORIENTATIONS = {
+    0: [0, 1, 2, 3],
+    90: [1, 3, 0, 2],
+    180: [3, 2, 1, 0],
+    270: [2, 0, 3, 1],
+}
+
+# Boards used before a registry file existed
+DEFAULT_BOARDS = [
+    {"id": "pcb_10", "markers": [11, 10, 12, 13], "width": 210, "height": 115},
+    {"id": "pcb_20", "markers": [20, 21, 22, 23], "width": 210, "height": 115},
+]
+
+
+class Board:
+    """
+    A registered board with its own pose, its own playfield in board
+    coordinates and a cached copy of that playfield in projector pixels.
+    """
+
+    def __init__(self, id: str, layout: BoardLayout, pose: PoseFilter, form_id_offset: int = 0):
+        self.id = id
+        self.layout = layout
+        self.pose = pose
+        self.playfield = Playfield(layout.width, layout.height)
+        # Forms in projector pixels, rebuilt by the caller when the pose changes
+        self.overlay = Playfield(0, 0)
+        self.overlay_key = None
+        # Board to table homography the overlay was built with
+        self.to_table: HomographyTransformer | None = None
+        # Keeps the form ids of several boards apart in the table playfield
+        self.form_id_offset = form_id_offset
+
+    def __repr__(self):
+        return f"Board({self.id}, {self.layout})"
+
+
+class BoardRegistry:
+    """
+    All boards that may appear on the table, looked up by marker id.
+
+    Only boards with a detected marker or a held pose are processed in a
+    frame, so the per-frame cost does not grow with the size of the registry.
+    """
+
+    def __init__(self, boards: list[Board]):
+        self.boards: dict[str, Board] = {}
+        self._by_marker: dict[int, Board] = {}
+        for board in boards:
+            if board.id in self.boards:
+                raise ValueError(f"Duplicate board id: {board.id}")
+            self.boards[board.id] = board
+            for marker_id in board.layout.marker_ids:
+                if marker_id in self._by_marker:
+                    raise ValueError(
+                        f"Marker {marker_id} is used by boards {self._by_marker[marker_id].id} and {board.id}")
+                self._by_marker[marker_id] = board
+        # Boards that currently have a pose
+        self.active: dict[str, Board] = {}
+
+    @staticmethod
+    def from_config(config: list[dict], marker_size: float = 21.2, hold_time: float = 1.0,
+                    change_threshold: float = 0.5) -> 'BoardRegistry':
+        """
+        Build a registry from board entries like
+        {"id": "carrier_a", "markers": [11, 10, 12, 13], "width": 210, "height": 115,
+         "orientation": 0, "marker_size": 21.2}.
+        "markers" lists the marker ids at the TL, TR, BL and BR corner of the
+        carrier, "orientation" is the clockwise rotation (0, 90, 180 or 270)
+        of the board on it, "width" and "height" are the board's own size.
+        """
+        boards = []
+        for i, entry in enumerate(config):
+            orientation = int(entry.get("orientation", 0))
+            if orientation not in _ORIENTATIONS:
+                raise ValueError(
+                    f"Board {entry['id']}: orientation must be 0, 90, 180 or 270. Got {orientation}.")
+            markers = [int(entry["markers"][corner])
+                       for corner in _ORIENTATIONS[orientation]]
+            layout = BoardLayout(float(entry["width"]), float(entry["height"]), markers,
+                                 float(entry.get("marker_size", marker_size)))
+            boards.append(Board(str(entry["id"]), layout,
+                                PoseFilter(hold_time, change_threshold), (i + 1) * 10000))
+        return BoardRegistry(boards)
+
+    @staticmethod
+    def load(path: str, **kwargs) -> 'BoardRegistry':
+        """
+        Load a registry from a JSON file holding {"boards": [...]}, see from_config().
+        """
+        with open(path, "r") as f:
+            config = json.load(f)
+        print(f"Loaded {len(config['boards'])} boards from {path}.")
+        return BoardRegistry.from_config(config["boards"], **kwargs)
+
+    def board_for_marker(self, marker_id: int) -> Board | None:
+        return self._by_marker.get(marker_id)
+
+    def update(self, codes: dict[int, Code], timestamp: float) -> list[Board]:
+        """
+        Register the boards whose markers were detected and update all poses.
+        :param codes: Detected markers in table coordinates.
+        :return: The boards that have a pose after this frame.
+        """
+        seen: dict[str, Board] = {}
+        for marker_id in codes:
+            board = self._by_marker.get(marker_id)
+            if board is not None:
+                seen[board.id] = board
+
+        for board in seen.values():
+            board_to_pf = register_board(board.layout, codes)
+            corners = None
+            if board_to_pf is not None:
+                corners = board_to_pf.map_batch(board.layout.board_corners)
+            if board.pose.update(corners, timestamp) is not None:
+                self.active[board.id] = board
+
+        for board in list(self.active.values()):
+            if board.id not in seen:
+                board.pose.update(None, timestamp)
+            if board.pose.pose is None:
+                del self.active[board.id]
+
+        return list(self.active.values())
+
+    def __len__(self):
+        return len(self.boards)
@@ -0,0 +1,173 @@
+"""
+Offline marker-track extraction over recorded videos.
+
+Splits a video into frame ranges, runs the live marker detection on every
+frame in a process pool and writes one compressed .npz file with the columns
+frame, timestamp, marker_id and corners (one row per detected marker).
+Videos without a frame count or exact seeking are read in a single pass.
+
+    python -m organizer.pcb_tracker.extract session.avi -o session_tracks.npz
+"""
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from ..camera.replay import load_timestamps
+from .asuco import MarkerDetector, find_codes
+
+
+def _init_worker():
+    # One OpenCV thread per process, parallelism comes from the pool
+    cv2.setNumThreads(1)
+
+
+def _open_at(video_file: str, start: int) -> cv2.VideoCapture:
+    """
+    Open a video positioned at frame `start`, see _seekable().
+    """
+    cap = cv2.VideoCapture(video_file)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video {video_file}")
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+            cap.release()
+            raise ValueError(f"Cannot seek to frame {start} of {video_file}")
+    return cap
+
+
+def _seekable(video_file: str, total: int) -> bool:
+    """
+    Whether seeking to a frame index lands exactly on it, tested once in the middle of the video.
+    """
+    target = total // 2
+    cap = cv2.VideoCapture(video_file)
+    try:
+        return cap.set(cv2.CAP_PROP_POS_FRAMES, target) and \
+            int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == target
+    finally:
+        cap.release()
+
+
+def extract_range(video_file: str, start: int = 0, stop: int | None = None,
+                  detector_settings: dict | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Detect markers in frames [start, stop) of a video.
+    :param stop: First frame not read, None to read until the end of the video.
+    :param detector_settings: Keyword arguments for MarkerDetector.
+    :return: Columns (frame, marker_id, corners) for this range.
+    """
+    detector = MarkerDetector(**(detector_settings or {}))
+    cap = _open_at(video_file, start)
+
+    frames, ids, corners = [], [], []
+    frame = None
+    index = start
+    while stop is None or index < stop:
+        ret, frame = cap.read(frame)
+        if not ret:
+            break
+        for code in find_codes(frame, detector).values():
+            frames.append(index)
+            ids.append(code.id)
+            corners.append(code.corners)
+        index += 1
+    cap.release()
+
+    return (np.array(frames, dtype=np.int32),
+            np.array(ids, dtype=np.int16),
+            np.array(corners, dtype=np.float32).reshape(-1, 4, 2))
+
+
+def extract_tracks(video_file: str, output_file: str, workers: int | None = None,
+                   shard_frames: int | None = None, detector_settings: dict | None = None) -> int:
+    """
+    Extract the marker tracks of a whole video in parallel.
+    :param workers: Worker processes, all cores if None.
+    :param shard_frames: Frames per shard, by default four shards per worker.
+    :return: Number of marker detections written.
+    """
+    cap = cv2.VideoCapture(video_file)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video {video_file}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    workers = workers or os.cpu_count() or 1
+    if total <= 0 or not _seekable(video_file, total):
+        # Shards would each have to read from the start, one pass is faster
+        print(f"Frame count or seeking of {video_file} is unreliable, extracting serially...")
+        shards = [extract_range(video_file, 0, None, detector_settings)]
+    else:
+        shard_frames = shard_frames or max(1, math.ceil(total / (workers * 4)))
+        starts = list(range(0, total, shard_frames))
+        # The last shard reads to the end, in case the frame count is too low
+        stops = starts[1:] + [None]
+        print(f"Extracting {total} frames of {video_file} in {len(starts)} shards "
+              f"on {workers} processes...")
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            shards = list(pool.map(
+                extract_range,
+                [video_file] * len(starts),
+                starts,
+                stops,
+                [detector_settings] * len(starts)))
+
+    frames = np.concatenate([shard[0] for shard in shards])
+    ids = np.concatenate([shard[1] for shard in shards])
+    corners = np.concatenate([shard[2] for shard in shards])
+
+    # Recorded capture times if the video came from SessionRecorder
+    timestamps = load_timestamps(video_file)
+    if timestamps is not None and (not len(frames) or len(timestamps) > frames.max()):
+        timestamp = np.asarray(timestamps, dtype=np.float64)[frames]
+    else:
+        timestamp = frames / fps
+
+    np.savez_compressed(output_file, frame=frames, timestamp=timestamp,
+                        marker_id=ids, corners=corners)
+    print(f"Wrote {len(frames)} marker detections to {output_file}")
+    return len(frames)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Extract ArUco marker tracks from recorded videos")
+    parser.add_argument("videos", type=str, nargs="+", help="Video files")
+    parser.add_argument(
+        "-o", "--output", type=str, default=None,
+        help="Output file, only with a single video (default: <video>.tracks.npz)")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument(
+        "--shard_frames", type=int, default=None, help="Frames per shard (default: 4 shards per worker)")
+    parser.add_argument(
+        "--aruco_dict", type=str, default="DICT_4X4_50",
+        help="ArUco dictionary of the markers (default: DICT_4X4_50)")
+    parser.add_argument(
+        "--aruco_params", type=str, default=None,
+        help="JSON file with ArUco DetectorParameters overrides")
+    parser.add_argument(
+        "--marker_pyramid", type=float, default=1.0,
+        help="Detect on frames downscaled by this factor (default: 1, off)")
+    args = parser.parse_args()
+
+    if args.output and len(args.videos) > 1:
+        parser.error("--output only works with a single video")
+
+    detector_settings = {"dictionary": args.aruco_dict,
+                         "pyramid_scale": args.marker_pyramid}
+    if args.aruco_params:
+        with open(args.aruco_params, "r") as f:
+            detector_settings["parameters"] = json.load(f)
+
+    for video in args.videos:
+        extract_tracks(video, args.output or video + ".tracks.npz",
+                       args.workers, args.shard_frames, detector_settings)
@@ -0,0 +1,99 @@
+import math
+
+import numpy as np
+
+
+class OneEuroFilter:
+    """
+    One-Euro filter (Casiez et al. 2012) applied element-wise to an array.
+
+    Slow movements are smoothed strongly to remove jitter, fast movements
+    raise the cutoff frequency so the output does not lag behind.
+    """
+
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 0.05, d_cutoff: float = 1.0):
+        """
+        :param min_cutoff: Cutoff frequency in Hz when the value is at rest.
+        :param beta: How fast the cutoff rises with speed.
+        :param d_cutoff: Cutoff frequency in Hz for the speed estimate.
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self) -> None:
+        self._x: np.ndarray | None = None
+        self._dx: np.ndarray | None = None
+        self._t: float | None = None
+
+    @staticmethod
+    def _alpha(dt: float, cutoff):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, value: np.ndarray, timestamp: float) -> np.ndarray:
+        value = np.asarray(value, dtype=float)
+        if self._x is None:
+            self._x = value.copy()
+            self._dx = np.zeros_like(value)
+            self._t = timestamp
+            return self._x
+
+        dt = timestamp - self._t
+        if dt <= 0:
+            return self._x
+        self._t = timestamp
+
+        a_d = self._alpha(dt, self.d_cutoff)
+        self._dx = a_d * (value - self._x) / dt + (1 - a_d) * self._dx
+        a = self._alpha(dt, self.min_cutoff + self.beta * np.abs(self._dx))
+        self._x = a * value + (1 - a) * self._x
+        return self._x
+
+
+class PoseFilter:
+    """
+    Filters the four table-space corners (TL, TR, BL, BR) of a board.
+
+    The raw corners are smoothed with a One-Euro filter. While the board is
+    not detected, e.g. because a hand covers a marker, the last pose is held
+    for `hold_time` seconds. The published pose only moves when the filtered
+    corners drift more than `change_threshold` from it, and `changed` tells
+    whether it did in the last update, so unchanged poses can reuse the
+    downstream transform.
+    """
+
+    def __init__(self, hold_time: float = 1.0, change_threshold: float = 0.5,
+                 min_cutoff: float = 1.0, beta: float = 0.05):
+        """
+        :param hold_time: Seconds the last pose is kept without a detection.
+        :param change_threshold: Corner movement, in table units, that counts as a change.
+        """
+        self.hold_time = hold_time
+        self.change_threshold = change_threshold
+        self._filter = OneEuroFilter(min_cutoff, beta)
+        self._last_seen: float | None = None
+        self.pose: np.ndarray | None = None
+        self.changed = False
+
+    def update(self, corners, timestamp: float) -> np.ndarray | None:
+        """
+        Feed the corners detected in a frame, or None if the board was not detected.
+        :return: The current (4, 2) pose, or None if there is none.
+        """
+        self.changed = False
+
+        if corners is None:
+            if self.pose is not None and timestamp - self._last_seen > self.hold_time:
+                self.pose = None
+                self.changed = True
+                self._filter.reset()
+            return self.pose
+
+        filtered = self._filter(np.asarray(corners, dtype=float).reshape(4, 2), timestamp)
+        self._last_seen = timestamp
+        if self.pose is None or np.abs(filtered - self.pose).max() > self.change_threshold:
+            self.pose = filtered.copy()
+            self.changed = True
+        return self.pose
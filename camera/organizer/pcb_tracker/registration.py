@@ -0,0 +1,106 @@
+import numpy as np
+
+from ..transformer import HomographyTransformer
+from .asuco import Code
+
+# Corner offsets of a marker in ArUco order (TL, TR, BR, BL), in units of half its size
+_MARKER_CORNERS = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=float)
+
+
+class BoardLayout:
+    """
+    Where the markers of a board sit, in board coordinates.
+
+    Board coordinates have their origin at the top-left corner and use the
+    same units as the board size. The markers are centered on the four board
+    corners. Their rotation on the board does not need to be known, it is
+    resolved from the detection.
+    """
+
+    def __init__(self, width: float, height: float, marker_ids: list[int], marker_size: float = 21.2):
+        """
+        :param marker_ids: Marker ids at the top-left, top-right, bottom-left and bottom-right corner.
+        :param marker_size: Edge length of the black marker square, in board units.
+        """
+        if len(marker_ids) != 4:
+            raise ValueError(
+                f"Need exactly 4 marker ids (TL, TR, BL, BR). Got {len(marker_ids)}.")
+        self.width = width
+        self.height = height
+        self.marker_ids = list(marker_ids)
+        self.marker_size = marker_size
+        self.board_corners = np.array(
+            [[0, 0], [width, 0], [0, height], [width, height]], dtype=float)
+        self.centers = {id: self.board_corners[i]
+                        for i, id in enumerate(self.marker_ids)}
+
+    def marker_corners(self, id: int) -> np.ndarray:
+        """
+        The (4, 2) corners of a marker in board coordinates, in ArUco order.
+        """
+        return self.centers[id] + _MARKER_CORNERS * (self.marker_size / 2)
+
+    def __repr__(self):
+        return f"BoardLayout({self.width}x{self.height}, markers={self.marker_ids})"
+
+
+def _fit_similarity(src: np.ndarray, dst: np.ndarray):
+    """
+    Least-squares similarity transform (rotation, uniform scale, translation) src -> dst.
+    :return: A function mapping (N, 2) arrays.
+    """
+    z = src[:, 0] + 1j * src[:, 1]
+    w = dst[:, 0] + 1j * dst[:, 1]
+    z_mean, w_mean = z.mean(), w.mean()
+    a = np.vdot(z - z_mean, w - w_mean) / np.vdot(z - z_mean, z - z_mean)
+
+    def apply(points: np.ndarray) -> np.ndarray:
+        mapped = a * (points[:, 0] + 1j * points[:, 1] - z_mean) + w_mean
+        return np.column_stack([mapped.real, mapped.imag])
+    return apply
+
+
+def register_board(layout: BoardLayout, codes: dict[int, Code], min_markers: int = 2,
+                   max_error: float = 3.0) -> HomographyTransformer | None:
+    """
+    Solve the board -> table homography from all corners of the visible markers.
+
+    With n visible markers the fit uses 4n corner correspondences in a
+    least-squares solve, so two or three markers are enough. Markers whose
+    mean reprojection error exceeds `max_error` are dropped one at a time
+    and the fit is repeated, as long as `min_markers` remain.
+    :param codes: Detected markers in table coordinates, e.g. from fuse_codes().
+    :return: The transformer, or None if too few markers are visible.
+    """
+    visible = [id for id in layout.marker_ids
+               if id in codes and codes[id].corners is not None]
+    if len(visible) < min_markers or len(visible) < 2:
+        return None
+
+    # Markers may be rotated on the board: a rough fit from the centers
+    # tells which detected corner belongs to which board corner.
+    rough = _fit_similarity(np.array([layout.centers[id] for id in visible]),
+                            np.array([codes[id].center for id in visible], dtype=float))
+    board_points = {}
+    table_points = {}
+    for id in visible:
+        expected = rough(layout.marker_corners(id))
+        detected = np.asarray(codes[id].corners, dtype=float)
+        shifts = [np.roll(detected, -k, axis=0) for k in range(4)]
+        errors = [np.square(shifted - expected).sum() for shifted in shifts]
+        board_points[id] = layout.marker_corners(id)
+        table_points[id] = shifts[int(np.argmin(errors))]
+
+    while True:
+        transformer = HomographyTransformer(
+            np.vstack([board_points[id] for id in visible]),
+            np.vstack([table_points[id] for id in visible]))
+        if len(visible) <= min_markers:
+            return transformer
+
+        errors = [np.linalg.norm(transformer.map_batch(board_points[id]) - table_points[id], axis=1).mean()
+                  for id in visible]
+        worst = int(np.argmax(errors))
+        if errors[worst] <= max_error:
+            return transformer
+        del visible[worst]
@@ -1,8 +1,83 @@
+from numbers import Real
+
 import numpy as np
 
 from .datastructures import Point2Da
 
 
+class _Flattened:
+    """
+    The points of a nested object gathered into one (N, 2) buffer, and the
+    structure needed to put mapped points back in their place.
+    """
+
+    def __init__(self, obj):
+        self._chunks: list[np.ndarray] = []
+        self._pairs: list[tuple[float, float]] = []
+        self.count = 0
+        self.spec = self._flatten(obj)
+        self._flush()
+        self.points = np.concatenate(self._chunks) if self._chunks \
+            else np.empty((0, 2))
+
+    def _flush(self) -> None:
+        if self._pairs:
+            self._chunks.append(np.array(self._pairs, dtype=float))
+            self._pairs = []
+
+    def _add_point(self, x, y) -> int:
+        self._pairs.append((x, y))
+        self.count += 1
+        return self.count - 1
+
+    def _flatten(self, obj):
+        if obj is None:
+            print("Warning: None object passed to map_object. Returning None.")
+            return ("none",)
+        if isinstance(obj, Point2Da):
+            return ("point", self._add_point(obj.x, obj.y))
+        if isinstance(obj, np.ndarray) and obj.ndim >= 1 and obj.shape[-1] == 2:
+            # Any (..., 2) array of points is mapped as one block
+            self._flush()
+            self._chunks.append(obj.reshape(-1, 2).astype(float, copy=False))
+            start = self.count
+            self.count += obj.size // 2
+            return ("array", start, obj.shape, obj.dtype)
+        if isinstance(obj, (list, tuple)):
+            if len(obj) == 2 and all(isinstance(v, Real) for v in obj):
+                # A plain (x, y) pair
+                return ("pair", self._add_point(obj[0], obj[1]), type(obj))
+            return ("sequence", [self._flatten(item) for item in obj], type(obj))
+        print(
+            f"Warning: Unsupported object type {type(obj)} for mapping. Returning original object.")
+        return ("other", obj)
+
+    def rebuild(self, mapped: np.ndarray, spec=None):
+        """
+        The original structure with the points taken from `mapped`.
+        """
+        spec = self.spec if spec is None else spec
+        kind = spec[0]
+        if kind == "point":
+            x, y = mapped[spec[1]]
+            return Point2Da(x, y)
+        if kind == "array":
+            _, start, shape, dtype = spec
+            block = mapped[start:start + int(np.prod(shape[:-1]))]
+            # Integer points map to fractional ones, only floats keep their dtype
+            if not np.issubdtype(dtype, np.floating):
+                dtype = np.float64
+            return block.reshape(shape).astype(dtype, copy=False)
+        if kind == "pair":
+            x, y = mapped[spec[1]]
+            return spec[2]((float(x), float(y)))
+        if kind == "sequence":
+            return spec[2](self.rebuild(mapped, item) for item in spec[1])
+        if kind == "other":
+            return spec[1]
+        return None
+
+
 class HomographyTransformer:
     """
     Calibrates and applies a planar homography between two 2D point sets.
@@ -14,6 +89,11 @@ class HomographyTransformer:
         )
         mapped_point = transformer.map_point([x, y])
         mapped_points = transformer.map_batch([[x1,y1], [x2,y2]])
+
+    Transformers compose like their matrices, `b @ a` maps with `a` first
+    and then with `b`:
+        cam_to_projector = pf_to_pixel @ cam_to_pf
+        pf_to_cam = cam_to_pf.inverse()
     """
 
     def __init__(self, src_points, dst_points):
@@ -32,6 +112,47 @@ class HomographyTransformer:
                 "Need at least four corresponding points of same shape.")
         self.H = self._compute_homography(self.src, self.dst)
 
+    @staticmethod
+    def from_matrix(H, src_points=None, dst_points=None) -> 'HomographyTransformer':
+        """
+        Create a transformer from a 3x3 homography matrix.
+        :param src_points: Points the matrix was derived from, for reference only.
+        By default the corners of the unit square and where they map to.
+        """
+        H = np.asarray(H, dtype=float)
+        if H.shape != (3, 3):
+            raise ValueError(f"Need a 3x3 homography matrix. Got shape {H.shape}.")
+        if np.isclose(H[2, 2], 0):
+            raise ValueError("Homography matrix must have H[2, 2] != 0.")
+        transformer = HomographyTransformer.__new__(HomographyTransformer)
+        transformer.H = H / H[2, 2]
+        if src_points is None:
+            src_points = [[0, 0], [1, 0], [0, 1], [1, 1]]
+        transformer.src = np.asarray(src_points, dtype=float)
+        transformer.dst = transformer.map_batch(transformer.src) if dst_points is None \
+            else np.asarray(dst_points, dtype=float)
+        return transformer
+
+    @staticmethod
+    def identity() -> 'HomographyTransformer':
+        return HomographyTransformer.from_matrix(np.eye(3))
+
+    def inverse(self) -> 'HomographyTransformer':
+        """
+        The transformer mapping the other way, dst -> src.
+        """
+        if np.isclose(np.linalg.det(self.H), 0):
+            raise ValueError("Homography is singular and cannot be inverted.")
+        return HomographyTransformer.from_matrix(np.linalg.inv(self.H), self.dst, self.src)
+
+    def __matmul__(self, other: 'HomographyTransformer') -> 'HomographyTransformer':
+        """
+        Composition: (self @ other) maps with `other` first, then with `self`.
+        """
+        if not isinstance(other, HomographyTransformer):
+            return NotImplemented
+        return HomographyTransformer.from_matrix(self.H @ other.H, other.src)
+
     def _compute_homography(self, src_pts, dst_pts):
         """
         Compute homography matrix H that maps src_pts → dst_pts.
@@ -66,38 +187,38 @@ class HomographyTransformer:
         point = np.array([x_h / w_h, y_h / w_h])
         return Point2Da(point[0], point[1])
 
-    def map_batch(self, points):
+    def map_batch(self, points, return_valid: bool = False):
         """
         Apply homography to an array of shape (M,2) points.
-        Returns an array of mapped points of shape (M,2).
+        Returns an array of mapped points of shape (M,2). Points that map to
+        infinity (w≈0) come back as NaN, with return_valid=True a (M,) mask
+        of the finite ones is returned as well.
         """
-        pts = np.asarray(points, dtype=float)
-        ones = np.ones((pts.shape[0], 1))
-        hom_pts = np.hstack([pts, ones]) @ self.H.T
-        hom_pts = hom_pts / hom_pts[:, 2][:, None]
-        return hom_pts[:, :2]
+        pts = np.asarray(points, dtype=float).reshape(-1, 2)
+        hom_pts = pts @ self.H[:, :2].T + self.H[:, 2]
+        w = hom_pts[:, 2]
+        valid = ~np.isclose(w, 0)
+        mapped = hom_pts[:, :2] / np.where(valid, w, np.nan)[:, None]
+        if return_valid:
+            return mapped, valid
+        return mapped
 
-    def map_object(self, obj):
+    def map_object(self, obj, strict: bool = True):
         """
-        Apply homography to an object with a 'points' attribute.
-        The points should be a list of [x, y] pairs.
-        Returns a new object with transformed points.
+        Apply homography to all points in a nested object.
+
+        The object may be a Point2Da, an (x, y) pair, an array of shape
+        (..., 2), or any nesting of lists and tuples of those. All points are
+        mapped together in one batch and returned in the same structure.
+        :param strict: Raise a ValueError if any point maps to infinity (w≈0),
+        otherwise such points come back as NaN.
         """
-        # print("Mapping object with HomographyTransformer...")
-        if obj is None:
-            print("Warning: None object passed to map_object. Returning None.")
-            return None
-        elif isinstance(obj, list):
-            return [self.map_object(item) for item in obj]
-        elif isinstance(obj, Point2Da):
-            mapped_point = self.map_point([obj.x, obj.y])
-            return Point2Da(mapped_point.x, mapped_point.y)
-        else:
-            print(
-                f"Warning: Unsupported object type {type(obj)} for mapping. Returning original object.")
-            return obj
-
-        return obj
+        flattened = _Flattened(obj)
+        mapped, valid = self.map_batch(flattened.points, return_valid=True)
+        if strict and not valid.all():
+            raise ValueError(
+                f"Mapping resulted in infinite points (w≈0) at indices {np.flatnonzero(~valid).tolist()}")
+        return flattened.rebuild(mapped)
 
     def __str__(self):
         return f"HomographyTransformer(src_points={self.src}, dst_points={self.dst})"
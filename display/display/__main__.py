@@ -2,6 +2,7 @@
 import json
 import os
 import sys
+import time
 
 import cv2
 import pygame
@@ -34,6 +35,11 @@ mqtt = MqttHandler(os.getenv("MQTT_BROKER"),
 
 running = True
 
+# Glass-to-glass latency from the organizer's frame trace
+last_message = None
+latency_sum = 0.0
+latency_count = 0
+
 # Create a named window with fullscreen property
 cv2.namedWindow("Fullscreen", cv2.WND_PROP_FULLSCREEN)
 cv2.setWindowProperty(
@@ -49,6 +55,18 @@ while running:
     if ppf:
         cv2.imshow("Fullscreen", ppf.render(offset=Point2Da(0, 0)))
 
+    if mqtt.last_message is not last_message:
+        last_message = mqtt.last_message
+        meta = json.loads(last_message).get("meta") if last_message else None
+        if meta is not None:
+            latency_sum += time.time() - meta["captured"]
+            latency_count += 1
+            if latency_count == 100:
+                print(f"Frame {meta['frame_id']}: capture to display "
+                      f"{latency_sum / latency_count * 1000:.1f}ms (avg of {latency_count})")
+                latency_sum = 0.0
+                latency_count = 0
+
     # Break on 'q' key press
     if cv2.waitKey(1) & 0xFF == ord('q'):
         running = False